@@ -1,31 +1,25 @@
 from fastapi import Depends, HTTPException, APIRouter
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-import sqlite3
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-security = HTTPBearer()
+from .database import get_async_db
+from .models import User
+from .passwords import password_hasher
+from .revocations import RevocationPoller, record_revocation
+from .token_cache import TokenCache
+from . import settings
 
-# ✅ Use Argon2 only (no bcrypt at all)
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    default="argon2",
-    deprecated="auto"
-)
+security = HTTPBearer()
 
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
-# --- Database setup ---
-def get_db():
-    conn = sqlite3.connect("users.db")
-    conn.execute("CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT)")
-    return conn
-
 # --- Models ---
 class SignupRequest(BaseModel):
     username: str
@@ -36,58 +30,91 @@ class LoginRequest(BaseModel):
     password: str
 
 # --- Helpers ---
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-def verify_password(password: str, hashed: str):
-    return pwd_context.verify(password, hashed)
-
 def create_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     if "sub" not in to_encode:
         raise ValueError("Token payload must include 'sub'")
-    to_encode.update({"exp": datetime.utcnow() + expires_delta})
+    now = datetime.utcnow()
+    to_encode.update({"exp": now + expires_delta, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+# 👇 Verified tokens are remembered until their exp (see token_cache.py)
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE)
+# 👇 Logouts made on other workers (see revocations.py)
+revocation_poller = RevocationPoller(token_cache, settings.TOKEN_REVOCATION_POLL_SECONDS)
+
+def verify_token(token: str) -> str:
+    """Return the token's subject, verifying the signature only on a cache miss."""
+    # Fast path: revoking a token also evicts it, so a hit is still valid
+    username = token_cache.get(token)
+    if username is not None:
+        return username
+    # Revoked tokens are turned away before any signature work
+    if token_cache.is_revoked(token):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication token")
-        return username
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
+    username = payload.get("sub")
+    if username is None or "exp" not in payload:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+    iat = payload.get("iat", 0)
+    if token_cache.is_revoked(token, username, iat):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    token_cache.put(token, username, payload["exp"], iat)
+    return username
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return verify_token(credentials.credentials)
 
 # ✅ Define router
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 # --- Routes ---
 @router.post("/signup")
-def signup(request: SignupRequest):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE username=?", (request.username,))
-    if cur.fetchone():
+async def signup(request: SignupRequest, db: AsyncSession = Depends(get_async_db)):
+    if await db.get(User, request.username):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    # 👇 Argon2 is CPU-bound: run it on the dedicated (bounded) hashing pool
+    hashed = await password_hasher.hash(request.password)
+    db.add(User(username=request.username, password=hashed))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent signup for the same name
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Username already exists")
-    cur.execute("INSERT INTO users (username, password) VALUES (?, ?)",
-                (request.username, hash_password(request.password)))
-    conn.commit()
-    conn.close()
     return {"message": "User created successfully"}
 
 @router.post("/login")
-def login(request: LoginRequest):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT password FROM users WHERE username=?", (request.username,))
-    row = cur.fetchone()
-    conn.close()
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, request.username)
 
-    if not row or not verify_password(request.password, row[0]):
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    valid, new_hash = await password_hasher.verify_and_update(request.password, user.password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # 🔧 Stored hash used older Argon2 parameters: upgrade it transparently
+        user.password = new_hash
+        await db.commit()
 
     access_token = create_token({"sub": request.username}, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     refresh_token = create_token({"sub": request.username}, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@router.post("/logout")
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Revoke the presented token: here at once, on other workers within
+    TOKEN_REVOCATION_POLL_SECONDS (they read it back from revoked_tokens)."""
+    token = credentials.credentials
+    verify_token(token)
+    exp = jwt.get_unverified_claims(token)["exp"]
+    await record_revocation(db, token, exp)
+    token_cache.revoke(token, exp)
+    return {"message": "Logged out"}
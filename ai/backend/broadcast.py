@@ -0,0 +1,168 @@
+"""Per-room WebSocket fan-out with a bounded outbound queue per connection.
+
+`publish` never awaits a socket: it serializes the message once and drops
+it into every connection's queue. Each connection has its own writer task,
+so sends to different clients run concurrently and one slow phone can no
+longer stall its room. A client whose queue fills up, or whose send takes
+longer than the timeout, is disconnected.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+import orjson
+from fastapi import WebSocket
+
+from ai.backend import settings
+
+logger = logging.getLogger(__name__)
+
+# 1013 = "try again later": the client can reconnect and reload history
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+_CLOSE = object()
+
+
+class Connection:
+    def __init__(
+        self,
+        room: "Room",
+        websocket: WebSocket,
+        queue_size: int,
+        send_timeout: float,
+        paused: bool = False,
+    ):
+        self.room = room
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self._task: Optional[asyncio.Task] = None
+        if not paused:
+            self.resume()
+
+    def resume(self, skip_ids: Iterable[int] = ()):
+        """Start delivering. Queued messages whose id is in `skip_ids` (already
+        replayed to this client from history) are dropped first."""
+        if self._task is not None or self.closed:
+            return
+        skip_ids = set(skip_ids)
+        if skip_ids:
+            queued = []
+            while not self.queue.empty():
+                queued.append(self.queue.get_nowait())
+            for text in queued:
+                if orjson.loads(text).get("id") not in skip_ids:
+                    self.queue.put_nowait(text)
+        self._task = asyncio.create_task(self._writer())
+
+    def offer(self, text: str) -> bool:
+        """Queue `text` for sending; False if this client has fallen too far behind."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _writer(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                if text is _CLOSE:
+                    return
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Timed out or the socket is gone: stop delivering to it
+            self.room.drop(self)
+
+    def close(self, code: Optional[int] = None):
+        """Stop the writer. With `code`, also close the socket (slow client)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+
+class Room:
+    def __init__(self, broadcaster: "Broadcaster", room_id: str):
+        self.broadcaster = broadcaster
+        self.room_id = room_id
+        self.connections: Set[Connection] = set()
+
+    def publish(self, text: str) -> int:
+        delivered = 0
+        # 👇 Iterate over a copy: slow clients are dropped as we go
+        for conn in list(self.connections):
+            if conn.offer(text):
+                delivered += 1
+            else:
+                logger.info("Dropping slow chat client in room %s", self.room_id)
+                self.drop(conn)
+        return delivered
+
+    def drop(self, conn: Connection):
+        self.remove(conn, code=SLOW_CLIENT_CLOSE_CODE)
+
+    def remove(self, conn: Connection, code: Optional[int] = None):
+        if conn in self.connections:
+            self.connections.discard(conn)
+            conn.close(code)
+        if not self.connections:
+            self.broadcaster.rooms.pop(self.room_id, None)
+
+
+class Broadcaster:
+    def __init__(self, queue_size: int = 64, send_timeout: float = 5.0):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.rooms: Dict[str, Room] = {}
+
+    def connect(self, room_id: str, websocket: WebSocket, paused: bool = False) -> Connection:
+        """Register an accepted socket; must be called from the event loop.
+
+        A `paused` connection queues live messages but sends nothing until
+        `resume()`, so history can be replayed to it first without gaps.
+        """
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = Room(self, room_id)
+        conn = Connection(room, websocket, self.queue_size, self.send_timeout, paused=paused)
+        room.connections.add(conn)
+        return conn
+
+    def disconnect(self, conn: Connection):
+        conn.room.remove(conn)
+
+    def publish(self, room_id: str, message: dict) -> int:
+        """Fan `message` out to a room without waiting on any socket."""
+        # Serialized once per message, not once per socket
+        return self.publish_text(room_id, orjson.dumps(message).decode())
+
+    def publish_text(self, room_id: str, text: str) -> int:
+        room = self.rooms.get(room_id)
+        if room is None:
+            return 0
+        return room.publish(text)
+
+    def count(self, room_id: str) -> int:
+        room = self.rooms.get(room_id)
+        return len(room.connections) if room else 0
+
+
+broadcaster = Broadcaster(
+    queue_size=settings.CHAT_SEND_QUEUE_SIZE,
+    send_timeout=settings.CHAT_SEND_TIMEOUT,
+)
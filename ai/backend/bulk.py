@@ -0,0 +1,293 @@
+"""Bulk offer import: POST /offers/bulk and python -m ai.backend.bulk.
+
+Rows come as NDJSON (one OfferCreate object per line) or CSV with flat
+columns (have_name, have_quantity, have_category, have_image, want_name,
+want_quantity, want_category, want_image, want_owner, location, message).
+Input is read incrementally and handled BULK_BATCH_SIZE rows at a time.
+Each batch is one transaction with one candidate query. Its rows are
+matched against the pending pool and against earlier rows of the same
+import. Memory depends on the batch size, not the file size.
+
+Every input row gets one result line:
+{"row": 3, "status": "matched", "id": "...", "matched_with": "..."}, or
+"error" with a reason. The CLI prints each batch's lines as it commits;
+POST /offers/bulk buffers them and answers after the whole upload. Only two-way matches are made; trade cycles are
+still found only for offers posted one at a time.
+
+Usage: python -m ai.backend.bulk offers.csv --owner coop_lagos
+"""
+import argparse
+import asyncio
+import csv
+import os
+import sys
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from ai.backend import settings
+from ai.backend.database import AsyncSessionLocal, async_engine
+from ai.backend.matching import MatchIndex, claim_offers, match_index, reciprocal_candidates
+from ai.backend.models import Offer
+from ai.backend.offers import OfferCreate, build_offer
+from ai.backend.quantity import rates_agree
+
+FORMATS = ("ndjson", "csv")
+ITEM_FIELDS = ("name", "quantity", "category", "image", "owner")
+MAX_LINE_BYTES = 64 * 1024
+_IN_CHUNK = 500  # ids per IN (...) when loading pool candidates
+
+Record = Tuple[int, object]  # (row number, dict or the error that replaced it)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """Split a byte stream into text lines without holding more than one line.
+
+    A line over MAX_LINE_BYTES is dropped and yields None in its place.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+                yield None
+            elif len(line) > MAX_LINE_BYTES:
+                yield None
+            else:
+                yield line.decode("utf-8", errors="replace").rstrip("\r")
+        if len(buffer) > MAX_LINE_BYTES:
+            buffer, skipping = b"", True
+    if skipping:
+        yield None
+    elif buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _nest(flat: Dict[str, str]) -> dict:
+    """A flat CSV row as the nested OfferCreate shape."""
+    record = {
+        f"{side}_item": {
+            key: flat.get(f"{side}_{key}") or ("" if key == "category" else None)
+            for key in ITEM_FIELDS
+        }
+        for side in ("have", "want")
+    }
+    record["location"] = flat.get("location")
+    record["message"] = flat.get("message") or None
+    if flat.get("owner"):
+        record["owner"] = flat["owner"]
+    return record
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Record]:
+    """(row number, record) per data line; bad lines carry their error instead.
+
+    CSV rows must fit on one line (no quoted newlines).
+    """
+    header = None
+    row = 0
+    async for line in lines:
+        if line is not None and not line.strip():
+            continue
+        if fmt == "csv" and header is None and line is not None:
+            header = [name.strip().lstrip("\ufeff") for name in next(csv.reader([line]))]
+            continue
+        row += 1
+        if line is None:
+            yield row, ValueError(f"Line longer than {MAX_LINE_BYTES} bytes")
+            continue
+        try:
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                yield row, _nest(dict(zip(header, values)))
+            else:
+                yield row, orjson.loads(line.lstrip("\ufeff"))
+        except (orjson.JSONDecodeError, csv.Error) as exc:
+            yield row, exc
+
+
+def _error(row: int, exc: Exception) -> dict:
+    if isinstance(exc, ValidationError):
+        reason = "; ".join(
+            f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()
+        )
+    else:
+        reason = str(exc) or type(exc).__name__
+    return {"row": row, "status": "error", "error": reason}
+
+
+def _pair(a: Offer, b: Offer):
+    # Both rows are new in this batch: nobody else can see them yet
+    a.status = b.status = "matched"
+    a.matched_with, b.matched_with = b.id, a.id
+
+
+async def match_batch(db, offers: List[Offer]) -> List[Offer]:
+    """Pair new `offers` with pending offers or with each other.
+
+    Pool candidates for the whole batch come from one query (chunked IN).
+    Each pool partner is then claimed with a conditional UPDATE
+    (claim_offers); one taken in the meantime is skipped for the next
+    candidate. Returns the pool offers that got matched (already in `db`).
+    """
+    wanted = {
+        o.id: reciprocal_candidates(o, limit=settings.BULK_CANDIDATES) for o in offers
+    }
+    ids = sorted({cid for found in wanted.values() for cid, _ in found})
+    pool: Dict[str, Offer] = {}
+    for start in range(0, len(ids), _IN_CHUNK):
+        result = await db.execute(
+            select(Offer).where(Offer.id.in_(ids[start:start + _IN_CHUNK]), Offer.status == "pending")
+        )
+        pool.update((o.id, o) for o in result.scalars())
+    for candidate_id in set(ids) - pool.keys():
+        # Row changed behind our back (other worker, manual edit): drop it
+        match_index.discard(candidate_id)
+
+    # Earlier rows of this batch that are still unmatched
+    local = MatchIndex()
+    by_id: Dict[str, Offer] = {}
+    matched_pool = []
+    for offer in offers:
+        partner = None
+        for candidate_id, owner in wanted[offer.id]:
+            candidate = pool.get(candidate_id)
+            if (candidate is not None and candidate.status == "pending"
+                    and owner != offer.have_owner and rates_agree(offer, candidate)):
+                # 👇 Guarded claim: a single post or another batch may have taken it
+                if await claim_offers(db, [(candidate, offer.id)]):
+                    partner = candidate
+                    matched_pool.append(candidate)
+                    break
+                match_index.discard(candidate_id)
+        if partner is not None:
+            offer.status, offer.matched_with = "matched", partner.id
+            continue
+        for candidate_id, owner in reciprocal_candidates(offer, local):
+            candidate = by_id[candidate_id]
+            if owner != offer.have_owner and rates_agree(offer, candidate):
+                partner = candidate
+                local.discard(candidate_id)
+                break
+        if partner is not None:
+            _pair(offer, partner)
+        else:
+            local.add(offer)
+            by_id[offer.id] = offer
+    return matched_pool
+
+
+async def _import_batch(batch: List[Tuple[int, object]]) -> List[dict]:
+    """Commit the Offers in `batch`; error rows pass through, in row order."""
+    offers = [item for _, item in batch if isinstance(item, Offer)]
+    if offers:
+        try:
+            async with AsyncSessionLocal() as db:
+                matched_pool = await match_batch(db, offers)
+                db.add_all(offers)
+                # ✅ One commit per batch: inserts, matches and counters together
+                await db.commit()
+        except Exception as exc:
+            return [item if isinstance(item, dict) else _error(row, exc) for row, item in batch]
+
+        # ✅ Keep the in-memory match index in sync
+        for offer in offers:
+            match_index.add(offer)
+        for offer in matched_pool:
+            match_index.discard(offer.id)
+    return [
+        item if isinstance(item, dict) else
+        {"row": row, "status": item.status, "id": item.id, "matched_with": item.matched_with}
+        for row, item in batch
+    ]
+
+
+async def import_offers(
+    records: AsyncIterator[Record],
+    owner: str,
+    batch_size: int = settings.BULK_BATCH_SIZE,
+    allow_row_owner: bool = False,
+) -> AsyncIterator[dict]:
+    """Validate, insert and match records batch by batch; one result per record.
+
+    `allow_row_owner` lets a record's "owner" field override `owner` (CLI only:
+    over HTTP every row belongs to the caller).
+    """
+    batch: List[Tuple[int, object]] = []
+    async for row, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Row is not an object")
+            row_owner = record.pop("owner", None)
+            offer = OfferCreate.model_validate(record)
+            batch.append((row, build_offer(offer, (allow_row_owner and row_owner) or owner)))
+        except (ValidationError, ValueError, csv.Error) as exc:
+            batch.append((row, _error(row, exc)))
+        if len(batch) >= max(batch_size, 1):
+            for result in await _import_batch(batch):
+                yield result
+            batch = []
+    if batch:
+        for result in await _import_batch(batch):
+            yield result
+
+
+async def write_results(results: AsyncIterator[dict], out) -> dict:
+    """Write results as NDJSON to binary file `out`, then a summary line."""
+    summary = {"rows": 0, "pending": 0, "matched": 0, "error": 0}
+    async for result in results:
+        summary["rows"] += 1
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+        out.write(orjson.dumps(result) + b"\n")
+    out.write(orjson.dumps({"summary": summary}) + b"\n")
+    return summary
+
+
+async def _file_chunks(path: str, size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _main(args):
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    records = iter_records(iter_lines(_file_chunks(args.path)), fmt)
+    results = import_offers(records, args.owner, args.batch, allow_row_owner=True)
+    try:
+        summary = await write_results(results, sys.stdout.buffer)
+    finally:
+        await async_engine.dispose()
+    sys.stdout.flush()
+    print(f"Imported {summary['rows']} rows: {summary['matched']} matched, "
+          f"{summary['pending']} pending, {summary['error']} errors", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    from ai.backend.database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Import offers from NDJSON or CSV")
+    parser.add_argument("path")
+    parser.add_argument("--owner", required=True, help="owner for rows without an owner column")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--batch", type=int, default=settings.BULK_BATCH_SIZE)
+    cli_args = parser.parse_args()
+    if not os.path.exists(cli_args.path):
+        parser.error(f"No such file: {cli_args.path}")
+
+    init_db()
+    db = SessionLocal()
+    try:
+        match_index.rebuild(db)
+    finally:
+        db.close()
+    asyncio.run(_main(cli_args))
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+import logging
+import orjson
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import List, Optional, Tuple
 
-from .database import get_db
+from .database import AsyncSessionLocal, get_async_db
 from .auth import get_current_user
+from .broadcast import broadcaster
+from .pubsub import chat_bus
+from .chat_writer import chat_writer
+from .export import export_chat
 from . import models
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Pydantic schema for incoming messages
@@ -24,30 +34,108 @@ def serialize_chat(chat: models.ChatMessage):
         "timestamp": chat.timestamp.isoformat() if chat.timestamp else None,
     }
 
-# GET all messages for an offer
+# Missed messages are replayed to a resuming socket in pages of this size
+RESUME_PAGE_SIZE = 200
+
+CHAT_COLUMNS = (
+    models.ChatMessage.id,
+    models.ChatMessage.offer_id,
+    models.ChatMessage.sender,
+    models.ChatMessage.content,
+    models.ChatMessage.timestamp,
+)
+
+def chat_row(row):
+    chat_id, offer_id, sender, content, timestamp = row
+    return {
+        "id": chat_id,
+        "offer_id": offer_id,
+        "sender": sender,
+        "content": content,
+        "timestamp": timestamp.isoformat() if timestamp else None,
+    }
+
+async def chat_page(
+    db: AsyncSession,
+    offer_id: str,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+) -> Tuple[List[dict], bool]:
+    """One page of an offer's chat in (timestamp, id) order, plus whether more exist.
+
+    `after_id` pages forward (newer), `before_id` backward (older); with
+    neither we return the latest `limit` messages. Every page is one seek on
+    ix_chat_messages_offer_timestamp_id, however long the history is.
+    """
+    key = tuple_(models.ChatMessage.timestamp, models.ChatMessage.id)
+    stmt = select(*CHAT_COLUMNS).where(models.ChatMessage.offer_id == offer_id)
+
+    anchor_id = after_id if after_id is not None else before_id
+    if anchor_id is not None:
+        anchor = (await db.execute(
+            select(models.ChatMessage.timestamp, models.ChatMessage.id)
+            .where(models.ChatMessage.id == anchor_id, models.ChatMessage.offer_id == offer_id)
+        )).first()
+        if anchor is None:
+            raise HTTPException(status_code=400, detail="Unknown chat cursor")
+        anchor_key = tuple_(anchor.timestamp, anchor.id)
+
+    if after_id is not None:
+        stmt = stmt.where(key > anchor_key).order_by(
+            models.ChatMessage.timestamp.asc(), models.ChatMessage.id.asc()
+        )
+    else:
+        if before_id is not None:
+            stmt = stmt.where(key < anchor_key)
+        stmt = stmt.order_by(models.ChatMessage.timestamp.desc(), models.ChatMessage.id.desc())
+
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after_id is None:
+        rows.reverse()  # fetched newest-first; clients want oldest-first
+    return [chat_row(r) for r in rows], has_more
+
+# GET messages for an offer (cursor-paged)
 @router.get("/offers/{offer_id}/chat")
-def get_chat_messages(offer_id: str, db: Session = Depends(get_db)):
-    offer = db.query(models.Offer).filter(models.Offer.id == offer_id).first()
+async def get_chat_messages(
+    offer_id: str,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if after_id is not None and before_id is not None:
+        raise HTTPException(status_code=400, detail="Use either after_id or before_id")
+    offer = await db.get(models.Offer, offer_id)
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
 
-    messages = (
-        db.query(models.ChatMessage)
-        .filter(models.ChatMessage.offer_id == offer_id)
-        .order_by(models.ChatMessage.timestamp.asc())
-        .all()
-    )
-    return {"messages": [serialize_chat(m) for m in messages]}
+    messages, has_more = await chat_page(db, offer_id, after_id, before_id, limit)
+    return {"messages": messages, "has_more": has_more}
+
+# Export an offer's whole chat (NDJSON / CSV), streamed
+@router.get("/offers/{offer_id}/chat/export")
+async def export_chat_messages(
+    offer_id: str,
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+):
+    offer = await db.get(models.Offer, offer_id)
+    if not offer:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    return export_chat(offer_id, format)
 
 # POST a new message
 @router.post("/offers/{offer_id}/chat")
-def post_chat_message(
+async def post_chat_message(
     offer_id: str,
     chat: ChatCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: str = Depends(get_current_user),
 ):
-    offer = db.query(models.Offer).filter(models.Offer.id == offer_id).first()
+    offer = await db.get(models.Offer, offer_id)
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
 
@@ -58,48 +146,78 @@ def post_chat_message(
         timestamp=datetime.utcnow(),
     )
     db.add(new_chat)
-    db.commit()
-    db.refresh(new_chat)
+    await db.commit()
+    await db.refresh(new_chat)
 
     return {"chat": serialize_chat(new_chat)}
 
-# Keep track of active connections per offer
-active_connections: Dict[str, List[WebSocket]] = {}
-
+# 👇 Connections live in the broadcaster (per-room queues + writer tasks);
+# messages go through the chat bus so sockets on other workers get them too
 async def broadcast_message(offer_id: str, message: dict):
-    if offer_id in active_connections:
-        for connection in active_connections[offer_id]:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                # Drop broken connections
-                active_connections[offer_id].remove(connection)
+    try:
+        await chat_bus.publish(offer_id, message)
+    except Exception:
+        # Already committed and sent locally: other workers' sockets miss it
+        # (they get it on resume), but the sender's socket must stay open
+        logger.exception("Chat bus publish failed for offer %s", offer_id)
+
+async def join_room(websocket: WebSocket, offer_id: str, last_seen_id: Optional[int] = None):
+    """Register an accepted socket; with `last_seen_id`, first send what it missed.
+
+    The connection is registered paused before history is read, so nothing
+    posted meanwhile is lost; messages seen in both are sent once.
+    """
+    if last_seen_id is None:
+        return broadcaster.connect(offer_id, websocket)
+
+    conn = broadcaster.connect(offer_id, websocket, paused=True)
+    replayed = set()
+    try:
+        async with AsyncSessionLocal() as db:
+            after_id = last_seen_id
+            while True:
+                messages, has_more = await chat_page(
+                    db, offer_id, after_id=after_id, limit=RESUME_PAGE_SIZE
+                )
+                for message in messages:
+                    await websocket.send_text(orjson.dumps(message).decode())
+                    replayed.add(message["id"])
+                if not has_more:
+                    break
+                after_id = messages[-1]["id"]
+    except HTTPException:
+        pass  # last_seen_id no longer exists (history cleared): live messages only
+    except Exception:
+        broadcaster.disconnect(conn)
+        raise
+    conn.resume(skip_ids=replayed)
+    return conn
 
 @router.websocket("/ws/chat/{offer_id}")
-async def websocket_chat(websocket: WebSocket, offer_id: str, db: Session = Depends(get_db)):
+async def websocket_chat(websocket: WebSocket, offer_id: str, last_seen_id: Optional[int] = None):
+    # 👇 No session held for the socket's lifetime: writes go through chat_writer
     await websocket.accept()
-
-    if offer_id not in active_connections:
-        active_connections[offer_id] = []
-    active_connections[offer_id].append(websocket)
+    conn = await join_room(websocket, offer_id, last_seen_id)
 
     try:
         while True:
             data = await websocket.receive_json()
             sender = data.get("sender")
             content = data.get("content")
+            if not sender or content is None:
+                continue  # would violate NOT NULL and fail the whole batch
 
-            new_chat = models.ChatMessage(
-                offer_id=offer_id,
-                sender=sender,
-                content=content,
-                timestamp=datetime.utcnow(),
-            )
-            db.add(new_chat)
-            db.commit()
-            db.refresh(new_chat)
+            # Committed with whatever else arrived in the same few ms
+            try:
+                chat = await chat_writer.write(offer_id, sender, content)
+            except IntegrityError:
+                # Offer gone (deleted from history): its chat went with it
+                await websocket.close(code=1008, reason="Offer not found")
+                break
 
             # Broadcast to all connected clients
-            await broadcast_message(offer_id, serialize_chat(new_chat))
+            await broadcast_message(offer_id, chat)
     except WebSocketDisconnect:
-        active_connections[offer_id].remove(websocket)
+        pass
+    finally:
+        broadcaster.disconnect(conn)
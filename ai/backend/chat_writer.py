@@ -0,0 +1,133 @@
+"""Group commit for chat messages.
+
+WebSocket handlers used to add + commit + refresh every chat line on their
+own session: one transaction (and, with synchronous=FULL, one fsync) per
+message. Now they hand the message to a single writer task, which collects
+whatever arrives within CHAT_WRITE_DELAY_MS (or CHAT_WRITE_BATCH rows) and
+inserts it in one transaction. Each caller still gets its own id and
+timestamp back for the broadcast payload.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ai.backend import settings
+from ai.backend.database import async_engine
+from ai.backend.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ChatWriter:
+    def __init__(self, engine: AsyncEngine, max_batch: int = 256, max_delay: float = 0.005):
+        self.engine = engine
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max_delay
+        self.batches = 0
+        self.rows = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+    def _ensure_started(self):
+        # Started lazily on the running loop, so it also works without app hooks
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._loop is not loop or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def start(self):
+        self._ensure_started()
+
+    async def write(self, offer_id: str, sender: str, content: str) -> dict:
+        """Queue one message and wait for its batch to commit; returns the chat payload."""
+        self._ensure_started()
+        row = {
+            "offer_id": offer_id,
+            "sender": sender,
+            "content": content,
+            "timestamp": datetime.utcnow(),
+        }
+        future = self._loop.create_future()
+        self._queue.put_nowait((row, future))
+        chat_id = await future
+        return {
+            "id": chat_id,
+            "offer_id": offer_id,
+            "sender": sender,
+            "content": content,
+            "timestamp": row["timestamp"].isoformat(),
+        }
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+            batch: List[Tuple[dict, asyncio.Future]] = [item]
+            stop = False
+            # 👇 Gather everything that arrives within the window (or up to max_batch)
+            deadline = self._loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[Tuple[dict, asyncio.Future]]):
+        rows = [row for row, _ in batch]
+        try:
+            async with self.engine.begin() as conn:
+                result = await conn.execute(
+                    insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True),
+                    rows,
+                )
+                ids = result.scalars().all()
+        except Exception as exc:
+            if len(batch) > 1:
+                # One bad row must not fail everyone else's message
+                for item in batch:
+                    await self._flush([item])
+                return
+            logger.exception("Chat insert failed")
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.rows += len(rows)
+        for (_, future), chat_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(chat_id)
+
+    async def stop(self):
+        """Flush what is queued, then stop the writer task."""
+        if self._task is not None and not self._task.done():
+            self._queue.put_nowait(_STOP)
+            await self._task
+        self._task = None
+
+
+chat_writer = ChatWriter(
+    async_engine,
+    max_batch=settings.CHAT_WRITE_BATCH,
+    max_delay=settings.CHAT_WRITE_DELAY_MS / 1000,
+)
@@ -0,0 +1,125 @@
+"""Materialized per-owner/per-status offer counts.
+
+Counts are adjusted from the ORM flush of every Offer insert, status change
+and delete, so they commit (or roll back) with the change itself. Set-based
+statements that bypass the ORM must call `bump_counter` themselves.
+
+Repair with: python -m ai.backend.counters
+"""
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ai.backend.models import Offer, OfferCounter
+
+
+def _status(value: Optional[str]) -> str:
+    return value or "pending"  # column default
+
+
+def _apply(connection, deltas: Counter):
+    for (owner, status), delta in deltas.items():
+        if not delta or owner is None:
+            continue
+        stmt = insert(OfferCounter).values(have_owner=owner, status=status, count=delta)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[OfferCounter.have_owner, OfferCounter.status],
+            set_={"count": OfferCounter.count + stmt.excluded.count},
+        ))
+
+
+def bump_counter(db: Session, owner: str, status: str, delta: int):
+    """Adjust one counter inside the caller's transaction."""
+    _apply(db.connection(), Counter({(owner, status): delta}))
+
+
+def move_offers(db: Session, owners: Iterable[str], old: str, new: str) -> None:
+    """Counters for offers a set-based UPDATE moved from status `old` to `new`.
+
+    `owners` has one have_owner per updated row, as the UPDATE returned them.
+    """
+    deltas = Counter()
+    for owner in owners:
+        deltas[(owner, old)] -= 1
+        deltas[(owner, new)] += 1
+    _apply(db.connection(), deltas)
+
+
+def forget_offers(db: Session, rows: Iterable) -> None:
+    """Decrement counters for offers removed by a set-based DELETE.
+
+    `rows` are the (have_owner, status) pairs the DELETE returned.
+    """
+    _apply(db.connection(), Counter({
+        key: -n for key, n in Counter((owner, _status(status)) for owner, status in rows).items()
+    }))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_offer_counts(session, flush_context, instances):
+    # Collected before the flush, while deleted rows can still be read
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Offer):
+            deltas[(obj.have_owner, _status(obj.status))] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Offer):
+            history = inspect(obj).attrs.status.history
+            if history.deleted and history.added:
+                deltas[(obj.have_owner, _status(history.deleted[0]))] -= 1
+                deltas[(obj.have_owner, _status(history.added[0]))] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Offer):
+            history = inspect(obj).attrs.status.history
+            old = history.deleted[0] if history.deleted else obj.status
+            deltas[(obj.have_owner, _status(old))] -= 1
+    session.info["offer_count_deltas"] = deltas
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_offer_counts(session, flush_context):
+    deltas = session.info.pop("offer_count_deltas", None)
+    if deltas:
+        _apply(session.connection(), deltas)
+
+
+async def offer_count(
+    db: AsyncSession, owner: Optional[str] = None, statuses: Optional[Iterable[str]] = None
+) -> int:
+    stmt = select(func.coalesce(func.sum(OfferCounter.count), 0))
+    if owner is not None:
+        stmt = stmt.where(OfferCounter.have_owner == owner)
+    if statuses is not None:
+        stmt = stmt.where(OfferCounter.status.in_(list(statuses)))
+    return (await db.execute(stmt)).scalar()
+
+
+def rebuild_counters(db: Session) -> int:
+    """Recompute every counter from the offers table. Returns rows written."""
+    db.query(OfferCounter).delete()
+    rows = db.execute(
+        select(Offer.have_owner, func.coalesce(Offer.status, "pending"), func.count())
+        .where(Offer.have_owner.isnot(None))
+        .group_by(Offer.have_owner, func.coalesce(Offer.status, "pending"))
+    ).all()
+    db.bulk_insert_mappings(OfferCounter, [
+        {"have_owner": owner, "status": status, "count": count}
+        for owner, status, count in rows
+    ])
+    db.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from ai.backend.database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild_counters(db)} offer counters")
+    finally:
+        db.close()
@@ -0,0 +1,148 @@
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.backend.matching import MatchIndex, claim_offers, match_index
+from ai.backend.models import DeclinedPair, Offer
+
+# Cycles are 3 to 5 offers long, the new offer included:
+# A→B→C→A up to A→B→C→D→E→A. Two-way swaps stay with find_reciprocal_match.
+
+# How many concrete offers we look at per (have, want) bucket / item path
+CANDIDATES_PER_BUCKET = 8
+MAX_PATH_ATTEMPTS = 16
+
+
+def find_item_paths(index: MatchIndex, start: str, goal: str) -> Iterator[List[str]]:
+    """Yield item paths start → … → goal over the pending-offer graph, shortest first.
+
+    A path of n items is closed into a cycle of n offers by the new offer
+    (goal → start). Search is meet-in-the-middle: at most two hops forward
+    from `start` and two hops backward from `goal`, so the cost depends on
+    item fan-out, not on how many offers are pending.
+    """
+    if start == goal:
+        return
+    forward = {item: [start, item] for item in index.wants_for(start) if item != goal}
+    backward = {item: [item, goal] for item in index.haves_for(goal) if item != start}
+
+    # 3 offers: start → x → goal
+    for item in forward.keys() & backward.keys():
+        yield [start, item, goal]
+
+    # 4 offers: start → x → y → goal
+    forward2: Dict[str, List[str]] = {}
+    for item, path in forward.items():
+        for nxt in index.wants_for(item):
+            if nxt in path or nxt == goal:
+                continue
+            if nxt in backward:
+                yield path + [nxt, goal]
+            forward2.setdefault(nxt, path + [nxt])
+
+    # 5 offers: start → x → y → z → goal
+    for item, path in backward.items():
+        for prev in index.haves_for(item):
+            if prev in path or prev == start:
+                continue
+            head = forward2.get(prev)
+            if head is not None and item not in head:
+                yield head + path
+
+
+def _pick_offers(index: MatchIndex, items: List[str], owner: str) -> Optional[List[str]]:
+    """Pick one pending offer per hop of `items`, each from a different trader."""
+    used = {owner}
+    chosen = []
+    for have_name, want_name in zip(items, items[1:]):
+        for candidate_id, candidate_owner in index.candidates(
+            have_name, want_name, limit=CANDIDATES_PER_BUCKET
+        ):
+            if candidate_owner not in used:
+                used.add(candidate_owner)
+                chosen.append(candidate_id)
+                break
+        else:
+            return None
+    return chosen
+
+
+async def _has_declined_pair(db: AsyncSession, ring: List[Offer]) -> bool:
+    """True if any two neighbours in the ring declined each other before."""
+    edges = [(a.id, b.id) for a, b in zip(ring, ring[1:] + ring[:1])]
+    stmt = select(DeclinedPair.offer_id).where(
+        tuple_(DeclinedPair.offer_id, DeclinedPair.other_id).in_(edges)
+    ).limit(1)
+    return (await db.execute(stmt)).first() is not None
+
+
+async def find_swap_cycle(
+    db: AsyncSession, new_offer: Offer, index: MatchIndex = match_index
+) -> Optional[List[Offer]]:
+    """Find and claim pending offers that close a trade cycle with `new_offer`.
+
+    Returns the other offers in trade order: the first one holds what
+    `new_offer` wants, the last one wants what `new_offer` holds. They are
+    already matched into the cycle (apply_cycle); the caller commits.
+    """
+    attempts = 0
+    for items in find_item_paths(index, new_offer.want_name, new_offer.have_name):
+        attempts += 1
+        if attempts > MAX_PATH_ATTEMPTS:
+            return None
+        chosen = _pick_offers(index, items, new_offer.have_owner)
+        if chosen is None:
+            continue
+
+        result = await db.execute(
+            select(Offer).where(Offer.id.in_(chosen), Offer.status == "pending")
+        )
+        rows = {o.id: o for o in result.scalars()}
+        if len(rows) != len(chosen):
+            for offer_id in chosen:
+                if offer_id not in rows:
+                    index.discard(offer_id)
+            continue
+
+        cycle = [rows[offer_id] for offer_id in chosen]
+        ring = [new_offer] + cycle
+        if await _has_declined_pair(db, ring):
+            continue
+        if await apply_cycle(db, new_offer, cycle):
+            return cycle
+        # A member was taken since the re-check: try the next path
+    return None
+
+
+async def apply_cycle(db: AsyncSession, new_offer: Offer, cycle: List[Offer]) -> Optional[str]:
+    """Match every offer in the cycle; the caller commits once.
+
+    The existing members are claimed in one conditional UPDATE (see
+    claim_offers). If any was taken since it was read, nothing changes and
+    None is returned.
+    """
+    cycle_id = str(uuid.uuid4())
+    ring = [new_offer] + cycle
+    # matched_with points at the offer we receive our want from
+    claims = [(o, ring[(i + 2) % len(ring)].id) for i, o in enumerate(cycle)]
+    if not await claim_offers(db, claims, cycle_id):
+        return None
+    new_offer.status = "matched"
+    new_offer.matched_with = ring[1].id
+    new_offer.cycle_id = cycle_id
+    return cycle_id
+
+
+async def swap_partners(db: AsyncSession, offer: Offer) -> List[Offer]:
+    """Other offers taking part in `offer`'s swap (one for pairs, n-1 for cycles).
+
+    Load `offer` with `joinedload(Offer.partner)` and a pair costs no extra query.
+    """
+    if offer.cycle_id:
+        result = await db.execute(
+            select(Offer).where(Offer.cycle_id == offer.cycle_id, Offer.id != offer.id)
+        )
+        return list(result.scalars())
+    return [offer.partner] if offer.partner else []
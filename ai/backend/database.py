@@ -1,13 +1,56 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from ai.backend import settings
+
+# --- SQLite tuning, applied on every new DBAPI connection ---
+SQLITE_PRAGMAS = {
+    "journal_mode": settings.SQLITE_JOURNAL_MODE,
+    "synchronous": settings.SQLITE_SYNCHRONOUS,
+    "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": settings.SQLITE_MMAP_SIZE,
+    "cache_size": settings.SQLITE_CACHE_SIZE,
+    "foreign_keys": settings.SQLITE_FOREIGN_KEYS,
+}
+
+
+def apply_sqlite_pragmas(engine, pragmas=None):
+    """Register a connect hook that runs PRAGMAs on each new SQLite connection."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _pool_options(url: str) -> dict:
+    # In-memory SQLite uses a single static connection; nothing to size
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
 # --- existing sync setup ---
-SQLALCHEMY_DATABASE_URL = "sqlite:////Users/wolf-wernerleibling/Documents/Afromarket/ai/afromarket.db"
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    echo=settings.DB_ECHO,
+    **_pool_options(SQLALCHEMY_DATABASE_URL),
 )
+apply_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -29,9 +72,15 @@ def init_db():
 # --- NEW async setup ---
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
-ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:////Users/wolf-wernerleibling/Documents/Afromarket/ai/afromarket.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL
 
-async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, echo=True)
+# 👇 All offer/auth routes run on this engine
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    echo=settings.DB_ECHO,
+    **_pool_options(ASYNC_SQLALCHEMY_DATABASE_URL),
+)
+apply_sqlite_pragmas(async_engine.sync_engine)
 AsyncSessionLocal = sessionmaker(
     async_engine, expire_on_commit=False, class_=AsyncSession
 )
@@ -0,0 +1,195 @@
+"""Offer expiry: stale pending offers become "expired", old ones are purged.
+
+Nothing used to set the "expired" status, so abandoned offers stayed
+pending forever, in every listing and every match scan. A background task
+started with the app now sweeps every EXPIRY_INTERVAL_SECONDS:
+
+- pending offers posted more than OFFER_TTL_HOURS ago become "expired"
+  (they then show up in their owner's history);
+- with OFFER_PURGE_HOURS set, expired offers older than that are deleted,
+  chat included (ON DELETE CASCADE), after being appended as NDJSON to
+  OFFER_ARCHIVE_PATH when one is configured.
+
+Both steps walk ix_offers_status_timestamp oldest first in batches of
+EXPIRY_BATCH_SIZE rows. Each batch is its own short transaction, followed
+by a pause of EXPIRY_BATCH_PAUSE_MS, so requests get the SQLite write lock
+between batches instead of waiting behind one big UPDATE.
+
+Every worker runs a sweeper. That is harmless: a batch only touches rows
+still in the old status, and workers whose match index still holds an
+expired offer drop it on the next re-check against the row.
+
+Run one sweep by hand with: python -m ai.backend.expiry
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import orjson
+from sqlalchemy import delete, select, update
+
+from ai.backend import settings
+from ai.backend.counters import forget_offers, move_offers
+from ai.backend.database import AsyncSessionLocal
+from ai.backend.matching import match_index
+from ai.backend.models import Offer
+from ai.backend.offer_cache import response_cache
+from ai.backend.serializers import OFFER_KEYS, offer_columns
+
+logger = logging.getLogger(__name__)
+
+
+def _oldest(status: str, cutoff: datetime, limit: int):
+    """Ids of up to `limit` offers in `status` posted before `cutoff`, oldest first.
+
+    Used as `id IN (...)` with no other condition on the outer statement, so
+    SQLite reads the batch off the index and touches rows by primary key. The
+    statement runs under the write lock, so the rows cannot change in between.
+    """
+    return (
+        select(Offer.id)
+        .where(Offer.status == status, Offer.timestamp < cutoff)
+        .order_by(Offer.timestamp)
+        .limit(limit)
+        .scalar_subquery()
+    )
+
+
+async def expire_batch(cutoff: datetime, limit: int) -> int:
+    """Mark one batch of stale pending offers expired. Returns rows changed."""
+    async with AsyncSessionLocal() as db:
+        expired = (await db.execute(
+            update(Offer)
+            .where(Offer.id.in_(_oldest("pending", cutoff, limit)))
+            .values(status="expired", version=Offer.version + 1)
+            .returning(Offer.id, Offer.have_owner)
+            .execution_options(synchronize_session=False)
+        )).all()
+        if not expired:
+            return 0
+        # ✅ Set-based UPDATE: the flush hooks never see it, so counters move here
+        await db.run_sync(move_offers, [row.have_owner for row in expired], "pending", "expired")
+        await db.commit()
+    response_cache.invalidate([row.id for row in expired])
+    for row in expired:
+        match_index.discard(row.id)
+    return len(expired)
+
+
+def _archive(path: str, offers: List[Dict]) -> None:
+    with open(path, "ab") as f:
+        f.write(b"".join(orjson.dumps(offer) + b"\n" for offer in offers))
+
+
+async def purge_batch(cutoff: datetime, limit: int, archive_path: str = "") -> int:
+    """Delete one batch of old expired offers (archiving them first). Returns rows deleted."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            delete(Offer)
+            .where(Offer.id.in_(_oldest("expired", cutoff, limit)))
+            .returning(*offer_columns())
+            .execution_options(synchronize_session=False)
+        )).all()
+        if not rows:
+            return 0
+        offers = [dict(zip(OFFER_KEYS, row)) for row in rows]
+        if archive_path:
+            # Written before the commit: a failed commit may archive a row twice, never zero times
+            await asyncio.get_running_loop().run_in_executor(None, _archive, archive_path, offers)
+        await db.run_sync(forget_offers, [(o["have_owner"], o["status"]) for o in offers])
+        await db.commit()
+    response_cache.invalidate([o["id"] for o in offers])
+    return len(offers)
+
+
+async def _drain(step, cutoff: datetime, batch_size: int, pause: float, **kwargs) -> int:
+    total = 0
+    while True:
+        changed = await step(cutoff, batch_size, **kwargs)
+        total += changed
+        if changed < batch_size:
+            return total
+        await asyncio.sleep(pause)  # let queued writers take the lock
+
+
+async def sweep(
+    now: Optional[datetime] = None,
+    ttl_hours: float = settings.OFFER_TTL_HOURS,
+    purge_hours: float = settings.OFFER_PURGE_HOURS,
+    archive_path: str = settings.OFFER_ARCHIVE_PATH,
+    batch_size: int = settings.EXPIRY_BATCH_SIZE,
+    pause: float = settings.EXPIRY_BATCH_PAUSE_MS / 1000,
+) -> Dict[str, int]:
+    """One full pass: expire, then purge. Returns {"expired": n, "purged": n}."""
+    now = now or datetime.utcnow()
+    batch_size = max(batch_size, 1)
+    result = {"expired": 0, "purged": 0}
+    if ttl_hours > 0:
+        result["expired"] = await _drain(
+            expire_batch, now - timedelta(hours=ttl_hours), batch_size, pause
+        )
+    if purge_hours > 0:
+        result["purged"] = await _drain(
+            purge_batch, now - timedelta(hours=purge_hours), batch_size, pause,
+            archive_path=archive_path,
+        )
+    return result
+
+
+class ExpirySweeper:
+    """Runs `sweep` on the app's event loop every `interval` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.runs = 0
+        self.expired = 0
+        self.purged = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if settings.OFFER_TTL_HOURS <= 0 and settings.OFFER_PURGE_HOURS <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                result = await sweep()
+            except Exception:
+                # A locked or failing database must not kill the sweeper
+                logger.exception("Offer expiry sweep failed")
+            else:
+                self.runs += 1
+                self.expired += result["expired"]
+                self.purged += result["purged"]
+                if result["expired"] or result["purged"]:
+                    logger.info("Expired %(expired)d offers, purged %(purged)d", result)
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+expiry_sweeper = ExpirySweeper(settings.EXPIRY_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    from ai.backend.database import async_engine, init_db
+
+    async def _main():
+        try:
+            result = await sweep()
+        finally:
+            await async_engine.dispose()
+        print(f"Expired {result['expired']} offers, purged {result['purged']}")
+
+    init_db()
+    asyncio.run(_main())
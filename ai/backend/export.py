@@ -0,0 +1,104 @@
+"""Streaming exports of offers and chat history (NDJSON or CSV).
+
+One SELECT per export, read through a server-side cursor
+(AsyncSession.stream with yield_per) in EXPORT_BATCH_SIZE partitions of
+plain column tuples. Nothing is hydrated into ORM objects, and at most one
+partition is held at a time, so memory does not depend on table size.
+
+The export runs on its own session, because the response body is sent
+after the endpoint returns. In WAL mode it holds a read snapshot for the
+whole download: writers are not blocked, but checkpoints cannot move past
+it until the download finishes.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from ai.backend import settings
+from ai.backend.database import AsyncSessionLocal
+from ai.backend.models import ChatMessage, Offer
+from ai.backend.serializers import OFFER_KEYS, offer_columns
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CHAT_KEYS = ("id", "offer_id", "sender", "content", "timestamp")
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode(rows: Sequence, keys: Sequence[str], fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(stmt: Select, keys: Sequence[str], fmt: str) -> AsyncIterator[bytes]:
+    """Encoded chunks for every row of `stmt`, one chunk per cursor partition."""
+    if fmt == "csv":
+        yield _encode([keys], keys, fmt)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield _encode(rows, keys, fmt)
+
+
+def export_response(stmt: Select, keys: Sequence[str], fmt: str, filename: str) -> StreamingResponse:
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    return StreamingResponse(
+        stream_rows(stmt, keys, fmt),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+def offers_export_query(
+    status: Optional[str] = None,
+    owner: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Select:
+    """Offer columns in (timestamp, id) order, optionally filtered.
+
+    `status` may list several values ("pending,matched"). `since` is
+    inclusive and `until` exclusive. owner / status / range are served by the
+    ix_offers_owner_status_timestamp_id and ix_offers_timestamp_id indexes.
+    """
+    stmt = select(*offer_columns())
+    if owner:
+        stmt = stmt.where(Offer.have_owner == owner)
+    if status:
+        statuses = [s.strip() for s in status.split(",") if s.strip()]
+        stmt = stmt.where(Offer.status.in_(statuses))
+    if since:
+        stmt = stmt.where(Offer.timestamp >= since)
+    if until:
+        stmt = stmt.where(Offer.timestamp < until)
+    return stmt.order_by(Offer.timestamp, Offer.id)
+
+
+def chat_export_query(offer_id: str) -> Select:
+    """An offer's chat, oldest first, along ix_chat_messages_offer_timestamp_id."""
+    return (
+        select(*(getattr(ChatMessage, key) for key in CHAT_KEYS))
+        .where(ChatMessage.offer_id == offer_id)
+        .order_by(ChatMessage.timestamp, ChatMessage.id)
+    )
+
+
+def export_offers(fmt: str, **filters) -> StreamingResponse:
+    return export_response(offers_export_query(**filters), OFFER_KEYS, fmt, "offers")
+
+
+def export_chat(offer_id: str, fmt: str) -> StreamingResponse:
+    return export_response(chat_export_query(offer_id), CHAT_KEYS, fmt, f"chat-{offer_id}")
@@ -0,0 +1,171 @@
+"""Offline geocoding of offer locations onto a lat/lon grid.
+
+`Offer.location` is free text ("Ikeja, Lagos", "PH"). We resolve it against
+a bundled gazetteer (data/gazetteer.csv: place, lat, lon, aliases) without
+any network call, and file the offer under a grid cell of GEO_CELL_DEG
+degrees (~55 km at 0.5). Cells let matching and /offers/nearby look only at
+nearby offers instead of computing distances to every candidate.
+"""
+import csv
+import math
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.backend import settings
+from ai.backend.models import Offer
+from ai.backend.serializers import offer_columns
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+NEARBY_CELL_OVERFETCH = 2  # rows read per cell, as a multiple of the page size
+
+Cell = Tuple[int, int]
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_place(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, Tuple[float, float]]:
+    places = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            point = (float(row["lat"]), float(row["lon"]))
+            places[normalize_place(row["name"])] = point
+            for alias in filter(None, (row.get("aliases") or "").split(";")):
+                places.setdefault(normalize_place(alias), point)
+    return places
+
+
+_places = load_gazetteer()
+_max_words = max(len(name.split()) for name in _places)
+
+
+def resolve_location(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(lat, lon) for free-text `text`, or None if no known place is in it.
+
+    The whole string wins; otherwise the first known place name in it, longest
+    first, so "Ikeja, Lagos" resolves to Ikeja rather than Lagos.
+    """
+    if not text:
+        return None
+    norm = normalize_place(text)
+    if norm in _places:
+        return _places[norm]
+    words = norm.split()
+    for start in range(len(words)):
+        for size in range(min(_max_words, len(words) - start), 0, -1):
+            point = _places.get(" ".join(words[start:start + size]))
+            if point is not None:
+                return point
+    return None
+
+
+# --- Grid ---
+def cell_of(lat: float, lon: float, size: float = settings.GEO_CELL_DEG) -> Cell:
+    return (math.floor(lat / size), math.floor(lon / size))
+
+
+def cell_key(cell: Cell) -> str:
+    return f"{cell[0]}:{cell[1]}"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _cell_distance_km(lat: float, lon: float, cell: Cell, size: float) -> float:
+    """Lower bound on the distance from (lat, lon) to any point in `cell`."""
+    lat_c = min(max(lat, cell[0] * size), (cell[0] + 1) * size)
+    lon_c = min(max(lon, cell[1] * size), (cell[1] + 1) * size)
+    return haversine_km(lat, lon, lat_c, lon_c)
+
+
+@lru_cache(maxsize=4096)
+def cells_within(
+    lat: float, lon: float, radius_km: float, size: float = settings.GEO_CELL_DEG
+) -> Tuple[Cell, ...]:
+    """Grid cells that may hold points within `radius_km`, nearest first.
+
+    Memoised: offer coordinates come from the gazetteer, so the same few
+    hundred points repeat.
+    """
+    dlat = radius_km / KM_PER_DEG_LAT
+    dlon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    row0, col0 = cell_of(lat - dlat, lon - dlon, size)
+    row1, col1 = cell_of(lat + dlat, lon + dlon, size)
+    cells = []
+    for row in range(row0, row1 + 1):
+        for col in range(col0, col1 + 1):
+            d = _cell_distance_km(lat, lon, (row, col), size)
+            if d <= radius_km:
+                cells.append((d, (row, col)))
+    cells.sort()
+    return tuple(cell for _, cell in cells)
+
+
+def order_cells(lat: float, lon: float, cells, size: float = settings.GEO_CELL_DEG) -> List[Cell]:
+    """`cells` nearest first (for ranking when there is no radius limit)."""
+    return sorted(cells, key=lambda cell: _cell_distance_km(lat, lon, cell, size))
+
+
+def apply_location(offer) -> bool:
+    """Fill offer.lat / lon / geo_cell from offer.location. False if unresolved."""
+    point = resolve_location(offer.location)
+    if point is None:
+        offer.lat = offer.lon = offer.geo_cell = None
+        return False
+    offer.lat, offer.lon = point
+    offer.geo_cell = cell_key(cell_of(*point))
+    return True
+
+
+async def nearby_offers(
+    db: AsyncSession,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    status: Optional[str] = "pending",
+    limit: int = 20,
+) -> List[Tuple[Row, float]]:
+    """Offers within `radius_km`, nearest first, as (row, km).
+
+    Cells are read nearest first (one seek each on ix_offers_geo_cell_status)
+    and we stop as soon as no unread cell can beat the current top `limit`.
+    Each cell read is ordered by a flat-earth distance in SQL and capped at
+    NEARBY_CELL_OVERFETCH * `limit` rows, so a crowded cell (a whole city)
+    costs one sort in SQLite instead of shipping every row to Python; the
+    margin covers the approximation before rows are ranked by haversine.
+    """
+    found: List[Tuple[Row, float]] = []
+    size = settings.GEO_CELL_DEG
+    # 🔧 Squared planar distance, in degrees of latitude; only used for ordering
+    k = math.cos(math.radians(lat))
+    dlat, dlon = Offer.lat - lat, (Offer.lon - lon) * k
+    approx = dlat * dlat + dlon * dlon
+    for cell in cells_within(lat, lon, radius_km, size):
+        if len(found) >= limit and _cell_distance_km(lat, lon, cell, size) > found[limit - 1][1]:
+            break
+        stmt = select(*offer_columns()).where(Offer.geo_cell == cell_key(cell))
+        if status:
+            stmt = stmt.where(Offer.status == status)
+        stmt = stmt.order_by(approx).limit(limit * NEARBY_CELL_OVERFETCH)
+        for row in (await db.execute(stmt)).all():
+            km = haversine_km(lat, lon, row.lat, row.lon)
+            if km <= radius_km:
+                found.append((row, km))
+        found.sort(key=lambda item: item[1])
+    return found[:limit]
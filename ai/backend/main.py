@@ -1,27 +1,49 @@
 import logging
 import uuid
-import json
 import sqlalchemy
 from datetime import datetime
 from typing import Dict, List, Optional
 
 import random
+import tempfile
 
-from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 # 👇 Local imports
 from ai.backend.database import SessionLocal, engine, Base, get_async_db, init_db
 from ai.backend.models import Offer, ChatMessage
-from ai.backend.auth import router as auth_router, get_current_user
+from ai.backend.auth import router as auth_router, get_current_user, revocation_poller
 from . import models
 from . import chat
+from .matching import match_index, find_reciprocal_match, record_decline
+from .cycles import find_swap_cycle, swap_partners
+from .pagination import paginate
+from .counters import forget_offers, offer_count, rebuild_counters
+from .serializers import offer_columns, offer_dict, offer_row
+from .search import install_search, search_offers
+from .geo import nearby_offers, resolve_location
+from .taxonomy import canonical_item
+from .quantity import quantity_filters
+from .offers import OfferCreate, build_offer
+from .export import export_offers
+from .bulk import FORMATS as BULK_FORMATS, import_offers, iter_lines, iter_records, write_results
+from .passwords import password_hasher
+from .broadcast import broadcaster
+from .pubsub import chat_bus
+from .chat_writer import chat_writer
+from .expiry import expiry_sweeper
+from .offer_cache import (
+    cached_response, list_etag, list_key, offer_etag, offer_key, response_cache
+)
 
 
 from fastapi.security import OAuth2PasswordBearer
@@ -69,8 +91,8 @@ with engine.connect() as conn:
     print("Tables created:", tables)
 
 
-# ✅ FastAPI app
-app = FastAPI()
+# ✅ FastAPI app (orjson for every JSON body)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # ✅ Add CORS middleware
 app.add_middleware(
@@ -88,6 +110,40 @@ app.include_router(chat.router)
 @app.on_event("startup")
 def on_startup():
     init_db()
+    db = SessionLocal()
+    try:
+        match_index.rebuild(db)
+        # 👇 Tables created outside migrations start with empty counters
+        if not db.query(models.OfferCounter).first() and db.query(Offer).first():
+            rebuild_counters(db)
+    finally:
+        db.close()
+    # 👇 FTS table + sync triggers (no-op once installed)
+    with engine.begin() as connection:
+        install_search(connection)
+
+@app.on_event("startup")
+async def start_chat_bus():
+    await chat_bus.start()
+    await chat_writer.start()
+
+@app.on_event("startup")
+async def start_expiry_sweeper():
+    # 👇 Stale pending offers -> "expired" (and optional purge), in small batches
+    await expiry_sweeper.start()
+
+@app.on_event("startup")
+async def start_revocation_poller():
+    # 👇 Logouts served by other workers reach this worker's token cache
+    await revocation_poller.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await revocation_poller.stop()
+    await expiry_sweeper.stop()
+    await chat_writer.stop()
+    await chat_bus.stop()
+    password_hasher.shutdown()
 
 # Dependency: get DB session
 def get_db():
@@ -103,38 +159,13 @@ def to_dict(obj):
     data.pop("_sa_instance_state", None)
     return data
 
-# Pydantic schemas for input
-class Item(BaseModel):
-    name: str
-    quantity: str
-    category: str
-    image: Optional[str] = None
-    owner: Optional[str] = None
-
-class OfferCreate(BaseModel):
-    have_item: Item
-    want_item: Item
-    location: str
-    message: Optional[str] = None
-
-# 🔧 Helper: badge mapping
-def badge_for_status(status: str) -> str:
-    if status == "pending":
-        return "🟢 Pending"
-    elif status == "matched":
-        return "🟡 Matched"
-    elif status in ["completed", "declined"]:
-        return "🔴 " + status.capitalize()
-    else:
-        return status
-
 def generate_code(length=8):
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
 @app.post("/offers/{offer_id}/match/{matched_id}")
-def confirm_swap(offer_id: str, matched_id: str, db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    matched_offer = db.query(Offer).filter(Offer.id == matched_id).first()
+async def confirm_swap(offer_id: str, matched_id: str, db: AsyncSession = Depends(get_async_db)):
+    offer = await db.get(Offer, offer_id)
+    matched_offer = await db.get(Offer, matched_id)
 
     if not offer or not matched_offer:
         raise HTTPException(status_code=404, detail="Offer not found")
@@ -156,7 +187,9 @@ def confirm_swap(offer_id: str, matched_id: str, db: Session = Depends(get_db)):
     matched_offer.confirmation_code = generate_code()
     matched_offer.confirmed_by = matched_offer.have_owner
 
-    db.commit()
+    await db.commit()
+    match_index.discard(offer.id)
+    match_index.discard(matched_offer.id)
 
     return {
         "completion_code": completion_code,
@@ -164,56 +197,16 @@ def confirm_swap(offer_id: str, matched_id: str, db: Session = Depends(get_db)):
     }
 
 
-@app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Invalid credentials")
-    access_token = jwt.encode({"sub": user.username}, SECRET_KEY, algorithm=ALGORITHM)
-    return {"access_token": access_token, "token_type": "bearer"}
-
-
 # ✅ Create an offer
 @app.post("/offers")
-def create_offer(
+async def create_offer(
     offer: OfferCreate,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
 
     print("Incoming offer JSON:", offer.dict()) # ✅ Debug
-    def categorize_item(name: str) -> str:
-        name = name.lower()
-        if name in ["rice", "maize", "millet", "sorghum"]:
-            return "Grains"
-        elif name in ["yam", "cassava", "cocoyam", "sweet potato"]:
-            return "Tubers"
-        elif name in ["palm oil", "groundnut oil", "vegetable oil"]:
-            return "Oils"
-        elif name in ["beans", "lentils", "soybeans"]:
-            return "Legumes"
-        elif name in ["onion", "garlic", "ginger"]:
-            return "Spices"
-        else:
-            return "Misc"
-
-    new_offer = Offer(
-        id=str(uuid.uuid4()),
-        have_name=offer.have_item.name.lower(),
-        have_quantity=offer.have_item.quantity,
-        have_category=categorize_item(offer.have_item.name),
-        have_image=offer.have_item.image,
-        have_owner=current_user,
-        want_name=offer.want_item.name.lower(),
-        want_quantity=offer.want_item.quantity,
-        want_category=categorize_item(offer.want_item.name),
-        want_image=offer.want_item.image,
-        want_owner=offer.want_item.owner,
-        location=offer.location,
-        message=offer.message,
-        status="pending",
-        timestamp=datetime.utcnow(), # ✅ pass actual datetime object
-    )
+    new_offer = build_offer(offer, current_user)
 
     # ✅ Debug print at same level as db.add
     print("Saved offer:", new_offer)
@@ -221,232 +214,247 @@ def create_offer(
     db.add(new_offer)
 
     # 🔍 Try to find reciprocal match
-    match = db.query(Offer).filter(
-        Offer.have_name == new_offer.want_name,
-        Offer.want_name == new_offer.have_name,
-        Offer.status == "pending",
-        Offer.have_owner != current_user
-    ).first()
+    match = await find_reciprocal_match(db, new_offer, current_user)
 
+    cycle = []
     if match:
+        # 👇 The partner's side was claimed by find_reciprocal_match (pending -> matched)
         new_offer.status = "matched"
         new_offer.matched_with = match.id
-        match.status = "matched"
-        match.matched_with = new_offer.id
-        db.add(match)
+    else:
+        # 🔄 No two-way partner: try closing (and claiming) a 3-5 way trade cycle
+        cycle = await find_swap_cycle(db, new_offer) or []
 
-    db.commit()
-    db.refresh(new_offer)
+    # ✅ One commit for the whole swap, pair or cycle
+    await db.commit()
+    await db.refresh(new_offer)
+
+    # ✅ Keep the in-memory match index in sync
+    match_index.add(new_offer)
+    if match:
+        match_index.discard(match.id)
+    for o in cycle:
+        match_index.discard(o.id)
 
     return {
         "message": "Offer created",
-        "offer": {**to_dict(new_offer), "badge": badge_for_status(new_offer.status)}
+        "offer": offer_dict(new_offer)
     }
 
 
+# ✅ Bulk import (NDJSON or CSV body), one result line per input row
+@app.post("/offers/bulk")
+async def bulk_create_offers(
+    request: Request,
+    format: Optional[str] = None,
+    current_user: str = Depends(get_current_user),
+):
+    """Import an NDJSON or CSV body; answer one NDJSON result line per row.
+
+    The response is buffered, not streamed: rows are imported and committed
+    batch by batch while the body is read, but the client receives the
+    first result line only after the whole upload has been processed.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in BULK_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(BULK_FORMATS)}")
+
+    # 👇 Results are spooled (to disk past 1 MiB) and sent once the body is
+    # consumed: ASGI servers before spec 2.4 can't read a request while
+    # streaming a response
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    records = iter_records(iter_lines(request.stream()), fmt)
+    await write_results(import_offers(records, current_user), spool)
+    spool.seek(0)
+
+    def stream_spool():
+        with spool:
+            yield from iter(lambda: spool.read(64 * 1024), b"")
+
+    return StreamingResponse(stream_spool(), media_type="application/x-ndjson")
+
+
 # ✅ List ALL offers (landing page)
 @app.get("/offers")
-def list_offers(
+async def list_offers(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    item: Optional[str] = None,
+    min_quantity: Optional[str] = None,
+    max_quantity: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if page < 1:
-        page = 1
-    total = db.query(Offer).count()
-    offset = (page - 1) * page_size
-    offers = db.query(Offer).offset(offset).limit(page_size).all()
-
-    # ✅ Debug
-    print("Offers in DB:", [o.have_owner for o in offers])
-    total_pages = (total + page_size - 1) // page_size
-
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages,
-        "next_page": page + 1 if page < total_pages else None,
-        "prev_page": page - 1 if page > 1 else None,
-        "offers": [{**to_dict(o), "badge": badge_for_status(o.status)} for o in offers]
-    }
+    async def build():
+        query = select(*offer_columns())
+        # 🔍 Optional filters on the have side: ?item=rice&min_quantity=50kg
+        filters = quantity_filters(min_quantity, max_quantity)
+        if item:
+            filters.append(Offer.have_name == canonical_item(item)[0])
+        query = query.where(*filters)
+        # Counters only cover the unfiltered list
+        total = await offer_count(db) if include_total and not filters else None
+        offers, meta = await paginate(db, query, page, page_size, cursor, total)
+
+        # ✅ Debug
+        print("Offers in DB:", [o.have_owner for o in offers])
+
+        return {
+            **meta,
+            "offers": [offer_row(o) for o in offers]
+        }
+
+    # 👇 Cached body + ETag; If-None-Match gets a 304 (see ai.backend.offer_cache)
+    return await cached_response(
+        request, list_key(request), build, lambda payload, body: list_etag(body)
+    )
 
 
 
 
 # ✅ List MY offers (personal dashboard)
 @app.get("/offers/my")
-def list_my_offers(
+async def list_my_offers(
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if page < 1:
-        page = 1
-    query = db.query(Offer).filter(Offer.have_owner == current_user)
-    total = query.count()
-    offset = (page - 1) * page_size
-    offers = query.offset(offset).limit(page_size).all()
-    total_pages = (total + page_size - 1) // page_size
+    query = select(*offer_columns()).where(Offer.have_owner == current_user)
+    total = await offer_count(db, current_user) if include_total else None
+    offers, meta = await paginate(db, query, page, page_size, cursor, total)
 
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages,
-        "next_page": page + 1 if page < total_pages else None,
-        "prev_page": page - 1 if page > 1 else None,
-        "offers": [{**to_dict(o), "badge": badge_for_status(o.status)} for o in offers]
-    }
+    return ORJSONResponse({
+        **meta,
+        "offers": [offer_row(o) for o in offers]
+    })
 
 
 # ✅ Get active offers (pending + matched) for current user
 @app.get("/offers/active")
-def list_active_offers(
+async def list_active_offers(
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if page < 1:
-        page = 1
-    query = db.query(Offer).filter(
+    query = select(*offer_columns()).where(
         Offer.have_owner == current_user,
         Offer.status.in_(["pending", "matched"])
     )
-    total = query.count()
-    offset = (page - 1) * page_size
-    offers = query.offset(offset).limit(page_size).all()
-    total_pages = (total + page_size - 1) // page_size
+    total = await offer_count(db, current_user, ["pending", "matched"]) if include_total else None
+    offers, meta = await paginate(db, query, page, page_size, cursor, total)
+
+    return ORJSONResponse({
+        **meta,
+        "active_offers": [offer_row(o) for o in offers]
+    })
 
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages,
-        "next_page": page + 1 if page < total_pages else None,
-        "prev_page": page - 1 if page > 1 else None,
-        "active_offers": [{**to_dict(o), "badge": badge_for_status(o.status)} for o in offers]
-    }
 
+# 👇 What the history endpoints list, count and clear
+HISTORY_STATUSES = ("completed", "declined", "expired")
 
-# ✅ Get offer history (completed or declined) for current user
+
+# ✅ Get offer history (completed, declined or expired) for current user
 @app.get("/offers/history")
-def offer_history(
+async def offer_history(
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if page < 1:
-        page = 1
-    query = db.query(Offer).filter(
+    query = select(*offer_columns()).where(
         Offer.have_owner == current_user,
-        Offer.status.in_(["completed", "declined"])
+        Offer.status.in_(HISTORY_STATUSES)
     )
-    total = query.count()
-    offset = (page - 1) * page_size
-    offers = query.offset(offset).limit(page_size).all()
-    total_pages = (total + page_size - 1) // page_size
+    total = await offer_count(db, current_user, HISTORY_STATUSES) if include_total else None
+    offers, meta = await paginate(db, query, page, page_size, cursor, total)
 
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages,
-        "next_page": page + 1 if page < total_pages else None,
-        "prev_page": page - 1 if page > 1 else None,
-        "history": [{**to_dict(o), "badge": badge_for_status(o.status)} for o in offers]
-    }
+    return ORJSONResponse({
+        **meta,
+        "history": [offer_row(o) for o in offers]
+    })
 
 
 # ✅ Get only matched offers (your side only)
 @app.get("/offers/matches")
-def list_matched_offers(
+async def list_matched_offers(
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if page < 1:
-        page = 1
-
-    query = db.query(Offer).filter(
+    query = select(*offer_columns()).where(
         Offer.have_owner == current_user,
         Offer.status == "matched"
     )
+    total = await offer_count(db, current_user, ["matched"]) if include_total else None
+    offers, meta = await paginate(db, query, page, page_size, cursor, total)
 
-    total = query.count()
-    offset = (page - 1) * page_size
-    offers = query.offset(offset).limit(page_size).all()
-    total_pages = (total + page_size - 1) // page_size
-
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages,
-        "next_page": page + 1 if page < total_pages else None,
-        "prev_page": page - 1 if page > 1 else None,
-        "matches": [{**to_dict(o), "badge": badge_for_status(o.status)} for o in offers]
-    }
+    return ORJSONResponse({
+        **meta,
+        "matches": [offer_row(o) for o in offers]
+    })
 
 
 # ✅ Get matched offers with both sides
 @app.get("/offers/matches/full")
-def list_full_matches(
+async def list_full_matches(
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if page < 1:
-        page = 1
-
-    query = db.query(Offer).filter(
+    # ✅ Both sides in one query (LEFT JOIN on matched_with), as plain rows
+    Partner = aliased(Offer)
+    query = select(
+        *offer_columns(), *offer_columns(Partner, prefix="partner_")
+    ).outerjoin(Partner, Partner.id == Offer.matched_with).where(
         Offer.have_owner == current_user,
         Offer.status == "matched"
     )
-
-    total = query.count()
-    offset = (page - 1) * page_size
-    matched_offers = query.offset(offset).limit(page_size).all()
-    total_pages = (total + page_size - 1) // page_size
+    total = await offer_count(db, current_user, ["matched"]) if include_total else None
+    rows, meta = await paginate(db, query, page, page_size, cursor, total)
 
     results = []
-    for o in matched_offers:
-        partner = db.query(Offer).filter(Offer.id == o.matched_with).first()
+    for row in rows:
+        partner = offer_row(row, start=len(row) // 2)
         results.append({
-            "your_offer": {**to_dict(o), "badge": badge_for_status(o.status)},
-            "matched_offer": (
-                {**to_dict(partner), "badge": badge_for_status(partner.status)}
-                if partner else None
-            )
+            "your_offer": offer_row(row),
+            "matched_offer": partner if partner["id"] is not None else None
         })
 
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages,
-        "next_page": page + 1 if page < total_pages else None,
-        "prev_page": page - 1 if page > 1 else None,
+    return ORJSONResponse({
+        **meta,
         "matches": results
-    }
+    })
 
 
 # ✅ Mark an offer as completed
 @app.patch("/offers/{offer_id}/complete")
-def complete_offer(
+async def complete_offer(
     offer_id: str,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    offer = db.query(Offer).filter(
-        Offer.id == offer_id,
-        Offer.have_owner == current_user
-    ).first()
+    offer = (await db.execute(
+        select(Offer).options(joinedload(Offer.partner)).where(
+            Offer.id == offer_id,
+            Offer.have_owner == current_user
+        )
+    )).scalars().first()
 
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
@@ -457,31 +465,35 @@ def complete_offer(
     offer.status = "completed"
     db.add(offer)
 
-    if offer.matched_with:
-        partner = db.query(Offer).filter(Offer.id == offer.matched_with).first()
-        if partner:
-            partner.status = "completed"
-            db.add(partner)
+    partners = await swap_partners(db, offer)
+    for partner in partners:
+        partner.status = "completed"
+        db.add(partner)
 
-    db.commit()
-    db.refresh(offer)
+    await db.commit()
+    await db.refresh(offer)
+    match_index.discard(offer.id)
+    for partner in partners:
+        match_index.discard(partner.id)
 
     return {
         "message": "Offer marked as completed",
-        "offer": {**to_dict(offer), "badge": badge_for_status(offer.status)}
+        "offer": offer_dict(offer)
     }
 
 # ✅ Decline a matched offer
 @app.patch("/offers/{offer_id}/decline")
-def decline_offer(
+async def decline_offer(
     offer_id: str,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    offer = db.query(Offer).filter(
-        Offer.id == offer_id,
-        Offer.have_owner == current_user
-    ).first()
+    offer = (await db.execute(
+        select(Offer).options(joinedload(Offer.partner)).where(
+            Offer.id == offer_id,
+            Offer.have_owner == current_user
+        )
+    )).scalars().first()
 
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
@@ -492,29 +504,95 @@ def decline_offer(
     offer.status = "declined"
     db.add(offer)
 
-    if offer.matched_with:
-        partner = db.query(Offer).filter(Offer.id == offer.matched_with).first()
-        if partner:
-            partner.status = "declined"
-            db.add(partner)
+    partners = await swap_partners(db, offer)
+    for partner in partners:
+        partner.status = "declined"
+        db.add(partner)
 
-    db.commit()
-    db.refresh(offer)
+    await db.commit()
+    await db.refresh(offer)
+    match_index.discard(offer.id)
+    for partner in partners:
+        match_index.discard(partner.id)
 
     return {
         "message": "Offer declined",
-        "offer": {**to_dict(offer), "badge": badge_for_status(offer.status)}
+        "offer": offer_dict(offer)
     }
 
+# 📍 Offers near a place or point, nearest first
+@app.get("/offers/nearby")
+async def list_nearby_offers(
+    location: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(50, gt=0, le=500),
+    status: Optional[str] = "pending",
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if lat is None or lon is None:
+        point = resolve_location(location)
+        if point is None:
+            raise HTTPException(status_code=400, detail="Unknown location; pass lat and lon")
+        lat, lon = point
+    rows = await nearby_offers(db, lat, lon, radius_km, status, limit)
+    return ORJSONResponse({
+        "lat": lat,
+        "lon": lon,
+        "radius_km": radius_km,
+        "offers": [{**offer_row(r), "distance_km": round(km, 1)} for r, km in rows]
+    })
+
+# 🔍 Full-text search (declared before /offers/{offer_id} so "search" isn't taken as an id)
+@app.get("/offers/search")
+async def search_offers_endpoint(
+    q: str,
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    rows, next_cursor = await search_offers(db, q, status, limit, cursor)
+    return ORJSONResponse({
+        "query": q,
+        "next_cursor": next_cursor,
+        "offers": [offer_row(r) for r in rows]
+    })
+
+
+# ✅ Export offers (NDJSON / CSV), streamed through a server-side cursor
+@app.get("/offers/export")
+async def export_offers_route(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    owner: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    return export_offers(format, status=status, owner=owner, since=since, until=until)
+
+
 # ✅ Get single offer by ID
 @app.get("/offers/{offer_id}")
-def get_offer(offer_id: str, db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
+async def get_offer(offer_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        offer = (await db.execute(
+            select(*offer_columns()).where(Offer.id == offer_id)
+        )).first()
+        if not offer:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        return offer_row(offer)
+
+    return await cached_response(
+        request, offer_key(offer_id), build, lambda payload, body: offer_etag(payload["version"])
+    )
+
 
-        print("Returning offers:", offers) # ✅ Debug
-    return {**to_dict(offer), "badge": badge_for_status(offer.status)}
+@app.get("/metrics/cache")
+async def cache_metrics():
+    # 📍 Response cache hit rate for this worker
+    return response_cache.stats()
 
 
 
@@ -524,8 +602,8 @@ def generate_secure_code(length: int = 20) -> str:
 
 # ✅ Creator generates code
 @app.post("/offers/{offer_id}/generate-code")
-def generate_offer_code(offer_id: str, db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
+async def generate_offer_code(offer_id: str, db: AsyncSession = Depends(get_async_db)):
+    offer = await db.get(Offer, offer_id)
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
 
@@ -534,7 +612,7 @@ def generate_offer_code(offer_id: str, db: Session = Depends(get_db)):
     offer.confirmation_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
     offer.confirmed_by = offer.have_owner
 
-    db.commit()
+    await db.commit()
     return {
         "completion_code": offer.completion_code,
         "confirmation_code": offer.confirmation_code,
@@ -542,8 +620,10 @@ def generate_offer_code(offer_id: str, db: Session = Depends(get_db)):
     }
 
 @app.post("/offers/{offer_id}/confirm-code")
-def confirm_code(offer_id: str, code: str, db: Session = Depends(get_db)):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
+async def confirm_code(offer_id: str, code: str, db: AsyncSession = Depends(get_async_db)):
+    offer = (await db.execute(
+        select(Offer).options(joinedload(Offer.partner)).where(Offer.id == offer_id)
+    )).scalars().first()
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
 
@@ -553,52 +633,65 @@ def confirm_code(offer_id: str, code: str, db: Session = Depends(get_db)):
     offer.status = "completed"
     db.add(offer)
 
-    if offer.matched_with:
-        partner = db.query(Offer).filter(Offer.id == offer.matched_with).first()
-        if partner:
-            partner.status = "completed"
-            db.add(partner)
+    partners = await swap_partners(db, offer)
+    for partner in partners:
+        partner.status = "completed"
+        db.add(partner)
 
-    db.commit()
+    await db.commit()
+    match_index.discard(offer.id)
+    for partner in partners:
+        match_index.discard(partner.id)
     return {"message": "Swap confirmed!"}
 
 
 @app.post("/offers/{offer_id}/decline-swap")
-def decline_swap(
+async def decline_swap(
     offer_id: str,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
+    offer = (await db.execute(
+        select(Offer).options(joinedload(Offer.partner)).where(Offer.id == offer_id)
+    )).scalars().first()
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
 
     matched_with_id = offer.matched_with
+    partners = await swap_partners(db, offer)
 
     # Reset this offer
     offer.status = "pending"
     offer.matched_with = None
+    offer.cycle_id = None
 
-    # Reset the other side too
-    if matched_with_id:
-        other_offer = db.query(Offer).filter(Offer.id == matched_with_id).first()
-        if other_offer:
-            other_offer.status = "pending"
-            other_offer.matched_with = None
+    # Reset the other side(s) too — every member of a trade cycle
+    for other_offer in partners:
+        other_offer.status = "pending"
+        other_offer.matched_with = None
+        other_offer.cycle_id = None
 
-            # ✅ Track decline relationship
+        # ✅ Track decline relationship with the direct partner
+        if other_offer.id == matched_with_id:
             offer.add_declined_with(other_offer.id)
             other_offer.add_declined_with(offer.id)
+            # 👇 What the matcher reads (declined_with stays for API payloads)
+            await record_decline(db, offer.id, other_offer.id)
+
+    # ✅ Clear chat messages tied to this offer and the other offer(s)
+    await db.execute(
+        delete(ChatMessage).where(
+            ChatMessage.offer_id.in_([offer.id] + [o.id for o in partners])
+        )
+    )
 
-    # ✅ Clear chat messages tied to this offer
-    db.query(ChatMessage).filter(ChatMessage.offer_id == offer.id).delete()
-
-    # ✅ Also clear chat messages tied to the other offer (if any)
-    if matched_with_id:
-        db.query(ChatMessage).filter(ChatMessage.offer_id == matched_with_id).delete()
+    await db.commit()
+    await db.refresh(offer)
 
-    db.commit()
-    db.refresh(offer)
+    # ✅ Everyone is back in the pool
+    match_index.add(offer)
+    for other_offer in partners:
+        match_index.add(other_offer)
 
     return {"message": "Swap declined and returned to pool"}
 
@@ -606,48 +699,43 @@ def decline_swap(
 
     # ✅ Send a message
 @app.post("/offers/{offer_id}/chat")
-def send_message(
+async def send_message(
     offer_id: str,
     msg: ChatMessageCreate,  # ✅ now defined
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    if not await db.get(Offer, offer_id):
+        raise HTTPException(status_code=404, detail="Offer not found")
+
     chat = ChatMessage(
         offer_id=offer_id,
         sender=current_user,
         content=msg.content
     )
     db.add(chat)
-    db.commit()
-    db.refresh(chat)
+    await db.commit()
+    await db.refresh(chat)
     return {"message": "sent", "chat": to_dict(chat)}
 
 
 @app.get("/offers/{offer_id}/chat")
-async def get_messages(offer_id: str, db: AsyncSession = Depends(get_async_db)):
-    result = await db.execute(
-        select(ChatMessage).where(ChatMessage.offer_id == offer_id).order_by(ChatMessage.timestamp)
-    )
-    chats = result.scalars().all()
-    return {
-        "messages": [
-            {
-                "id": c.id,
-                "sender": c.sender,
-                "content": c.content,
-                "timestamp": c.timestamp.isoformat(),
-            }
-            for c in chats
-        ]
-    }
-
+async def get_messages(
+    offer_id: str,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # 👇 Same cursor paging as chat.get_chat_messages (which is registered first)
+    messages, has_more = await chat.chat_page(db, offer_id, after_id, before_id, min(limit, 500))
+    return {"messages": messages, "has_more": has_more}
 
-connections = {}  # keep at module level
 
 @app.websocket("/ws/chat/{offer_id}")
-async def chat_ws(websocket: WebSocket, offer_id: str, db: AsyncSession = Depends(get_async_db)):
+async def chat_ws(websocket: WebSocket, offer_id: str, last_seen_id: Optional[int] = None):
     await websocket.accept()
-    connections.setdefault(offer_id, []).append(websocket)
+    conn = await chat.join_room(websocket, offer_id, last_seen_id)
 
     try:
         while True:
@@ -656,60 +744,64 @@ async def chat_ws(websocket: WebSocket, offer_id: str, db: AsyncSession = Depend
             sender = data.get("sender", "anon")
             content = data.get("content", "")
 
-            # ✅ Save asynchronously
-            msg = ChatMessage(offer_id=offer_id, sender=sender, content=content)
-            db.add(msg)
-            await db.commit()
-            await db.refresh(msg)
-
-            payload = {
-                "id": msg.id,
-                "offer_id": offer_id,
-                "sender": msg.sender,
-                "content": msg.content,
-                "timestamp": msg.timestamp.isoformat(),
-            }
-
-            print("📡 Broadcasting to", len(connections[offer_id]), "connections") # 👈 add here
-            # ✅ Broadcast
-            for conn in connections[offer_id]:
-                await conn.send_text(json.dumps(payload))
+            # ✅ Save via the group-commit writer (one transaction per batch)
+            try:
+                payload = await chat_writer.write(offer_id, sender, content)
+            except IntegrityError:
+                await websocket.close(code=1008, reason="Offer not found")
+                break
+
+            print("📡 Broadcasting to", broadcaster.count(offer_id), "connections") # 👈 add here
+            # ✅ Broadcast (every worker; queued per connection, never blocks on a slow socket)
+            await chat.broadcast_message(offer_id, payload)  # errors logged, socket kept
 
     except WebSocketDisconnect:
-        connections[offer_id].remove(websocket)
+        pass
+    finally:
+        broadcaster.disconnect(conn)
 
 @app.delete("/offers/history/clear")
-def clear_offer_history(
+async def clear_offer_history(
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    offers = db.query(Offer).filter(
-        Offer.have_owner == current_user,
-        Offer.status.in_(["completed", "declined", "expired"])
-    ).all()
-
-    if not offers:
+    # 👇 One DELETE; chat messages and declined pairs go with it (ON DELETE CASCADE)
+    deleted = (await db.execute(
+        delete(Offer)
+        .where(Offer.have_owner == current_user, Offer.status.in_(HISTORY_STATUSES))
+        .returning(Offer.id, Offer.have_owner, Offer.status)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    if not deleted:
         return {"message": "No history offers found to clear"}
 
-    for o in offers:
-        db.delete(o)
-    db.commit()
-    return {"message": f"Cleared {len(offers)} history offers"}
+    # ✅ The ORM flush hooks never see these rows: adjust counters here
+    await db.run_sync(forget_offers, [(row.have_owner, row.status) for row in deleted])
+    await db.commit()
+    response_cache.invalidate([row.id for row in deleted])
+    for row in deleted:
+        match_index.discard(row.id)
+    return {"message": f"Cleared {len(deleted)} history offers"}
 
 @app.delete("/offers/history/{offer_id}")
-def delete_offer_history(
+async def delete_offer_history(
     offer_id: str,
     current_user: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    offer = db.query(Offer).filter(
-        Offer.id == offer_id,
-        Offer.have_owner == current_user
-    ).first()
-
-    if not offer:
+    deleted = (await db.execute(
+        delete(Offer)
+        .where(Offer.id == offer_id, Offer.have_owner == current_user)
+        .returning(Offer.have_owner, Offer.status)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    if not deleted:
         raise HTTPException(status_code=404, detail="Offer not found")
 
-    db.delete(offer)
-    db.commit()
+    await db.run_sync(forget_offers, deleted)
+    await db.commit()
+    response_cache.invalidate([offer_id])
+    match_index.discard(offer_id)
     return {"message": "Offer deleted successfully"}
@@ -0,0 +1,364 @@
+import math
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ai.backend import settings
+from ai.backend.counters import move_offers
+from ai.backend.geo import KM_PER_DEG_LAT, Cell, cell_of, cells_within, haversine_km, order_cells
+from ai.backend.models import DeclinedPair, Offer
+from ai.backend.offer_cache import mark_changed
+from ai.backend.quantity import rate_compatible
+
+
+class MatchIndex:
+    """In-process hash index of pending offers keyed by (have_name, want_name).
+
+    The index is per-process: it is rebuilt from the database on startup and
+    every hit is re-checked against the row before it is used, so a stale
+    entry can never produce a wrong match.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, str], "OrderedDict[str, str]"] = {}
+        self._keys: Dict[str, Tuple[str, str]] = {}
+        # Item graph over non-empty buckets: have -> {wants}, want -> {haves}
+        self._out: Dict[str, Set[str]] = {}
+        self._in: Dict[str, Set[str]] = {}
+        # Spatial sub-buckets: (have, want) -> grid cell -> {offer_id: (owner, lat, lon)};
+        # offers whose location did not resolve sit under cell None
+        self._geo: Dict[Tuple[str, str], Dict[Optional[Cell], "OrderedDict[str, Tuple]"]] = {}
+        self._cells: Dict[str, Optional[Cell]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, offer: Offer):
+        if offer.status != "pending":
+            self.discard(offer.id)
+            return
+        key = (offer.have_name, offer.want_name)
+        with self._lock:
+            old_key = self._keys.get(offer.id)
+            if old_key is not None and old_key != key:
+                self._remove(offer.id, old_key)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = OrderedDict()
+                self._link(key)
+            bucket[offer.id] = offer.have_owner
+            self._keys[offer.id] = key
+            self._add_geo(offer.id, key, offer.have_owner, offer.lat, offer.lon)
+
+    def _add_geo(self, offer_id: str, key, owner: str, lat, lon):
+        cell = None if lat is None or lon is None else cell_of(lat, lon)
+        old_cell = self._cells.get(offer_id, cell)
+        if old_cell != cell:
+            self._remove_geo(offer_id, key)
+        self._geo.setdefault(key, {}).setdefault(cell, OrderedDict())[offer_id] = (owner, lat, lon)
+        self._cells[offer_id] = cell
+
+    def discard(self, offer_id: Optional[str]):
+        if offer_id is None:
+            return
+        with self._lock:
+            key = self._keys.get(offer_id)
+            if key is not None:
+                self._remove(offer_id, key)
+
+    def _remove(self, offer_id: str, key: Tuple[str, str]):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pop(offer_id, None)
+            if not bucket:
+                del self._buckets[key]
+                self._unlink(key)
+        self._keys.pop(offer_id, None)
+        self._remove_geo(offer_id, key)
+
+    def _remove_geo(self, offer_id: str, key: Tuple[str, str]):
+        if offer_id not in self._cells:
+            return
+        cell = self._cells.pop(offer_id)
+        cells = self._geo[key]
+        cells[cell].pop(offer_id, None)
+        if not cells[cell]:
+            del cells[cell]
+            if not cells:
+                del self._geo[key]
+
+    def _link(self, key: Tuple[str, str]):
+        have_name, want_name = key
+        self._out.setdefault(have_name, set()).add(want_name)
+        self._in.setdefault(want_name, set()).add(have_name)
+
+    def _unlink(self, key: Tuple[str, str]):
+        have_name, want_name = key
+        self._out[have_name].discard(want_name)
+        if not self._out[have_name]:
+            del self._out[have_name]
+        self._in[want_name].discard(have_name)
+        if not self._in[want_name]:
+            del self._in[want_name]
+
+    def candidates(
+        self, have_name: str, want_name: str, limit: Optional[int] = None
+    ) -> List[Tuple[str, str]]:
+        """Return (offer_id, owner) pairs of pending offers, oldest first."""
+        with self._lock:
+            bucket = self._buckets.get((have_name, want_name))
+            return list(islice(bucket.items(), limit)) if bucket else []
+
+    def candidates_near(
+        self,
+        have_name: str,
+        want_name: str,
+        lat: float,
+        lon: float,
+        max_km: Optional[float] = None,
+        per_cell: int = 32,
+    ) -> List[Tuple[str, str, float]]:
+        """(offer_id, owner, km) of located pending offers, nearest first.
+
+        Only grid cells within `max_km` are visited, and at most `per_cell`
+        (oldest) offers per cell, so the cost does not grow with the bucket.
+        """
+        with self._lock:
+            cells = self._geo.get((have_name, want_name))
+            if not cells:
+                return []
+            if max_km:
+                visit = [c for c in cells_within(lat, lon, max_km) if c in cells]
+            else:
+                visit = order_cells(lat, lon, [c for c in cells if c is not None])
+            found = []
+            for cell in visit:
+                for offer_id, (owner, o_lat, o_lon) in islice(cells[cell].items(), per_cell):
+                    km = haversine_km(lat, lon, o_lat, o_lon)
+                    if not max_km or km <= max_km:
+                        found.append((offer_id, owner, km))
+        found.sort(key=lambda c: c[2])
+        return found
+
+    def unlocated(self, have_name: str, want_name: str, limit: Optional[int] = None):
+        """(offer_id, owner) of pending offers in the bucket with no known location."""
+        with self._lock:
+            bucket = self._geo.get((have_name, want_name), {}).get(None)
+            if not bucket:
+                return []
+            return [(offer_id, entry[0]) for offer_id, entry in islice(bucket.items(), limit)]
+
+    def wants_for(self, have_name: str) -> Set[str]:
+        """Items that pending offers holding `have_name` ask for."""
+        with self._lock:
+            return set(self._out.get(have_name, ()))
+
+    def haves_for(self, want_name: str) -> Set[str]:
+        """Items that pending offers asking for `want_name` hold."""
+        with self._lock:
+            return set(self._in.get(want_name, ()))
+
+    def rebuild(self, db: Session):
+        rows = (
+            db.query(
+                Offer.id, Offer.have_name, Offer.want_name, Offer.have_owner, Offer.lat, Offer.lon
+            )
+            .filter(Offer.status == "pending")
+            .order_by(Offer.timestamp)
+            .all()
+        )
+        with self._lock:
+            self._buckets = {}
+            self._keys = {}
+            self._out = {}
+            self._in = {}
+            self._geo = {}
+            self._cells = {}
+            for offer_id, have_name, want_name, owner, lat, lon in rows:
+                key = (have_name, want_name)
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = OrderedDict()
+                    self._link(key)
+                bucket[offer_id] = owner
+                self._keys[offer_id] = key
+                self._add_geo(offer_id, key, owner, lat, lon)
+
+
+match_index = MatchIndex()
+
+
+def reciprocal_candidates(
+    new_offer: Offer, index: MatchIndex = match_index, limit: Optional[int] = None
+) -> List[Tuple[str, str]]:
+    """Candidate (offer_id, owner) pairs for `new_offer`, best first.
+
+    A located offer gets located candidates nearest first (within
+    MATCH_MAX_DISTANCE_KM when set), then candidates whose location we could
+    not resolve. Unlocated offers keep the old oldest-first order.
+    """
+    have_name, want_name = new_offer.want_name, new_offer.have_name
+    if new_offer.lat is None or new_offer.lon is None:
+        return index.candidates(have_name, want_name, limit)
+    near = index.candidates_near(
+        have_name, want_name, new_offer.lat, new_offer.lon,
+        max_km=settings.MATCH_MAX_DISTANCE_KM or None,
+    )
+    found = [(offer_id, owner) for offer_id, owner, _ in near[:limit]]
+    if limit is None or len(found) < limit:
+        found += index.unlocated(have_name, want_name, None if limit is None else limit - len(found))
+    return found
+
+
+RECHECK_CHUNK = 32
+
+
+async def claim_offers(
+    db: AsyncSession, claims: List[Tuple[Offer, str]], cycle_id: Optional[str] = None
+) -> bool:
+    """Match pending offers, all or nothing, in one conditional UPDATE.
+
+    `claims` pairs each loaded Offer with the id it gets as matched_with.
+    Nothing changes and False is returned if any of them is no longer
+    pending: another request (or worker) matched it since it was read.
+    The loaded objects are updated in place without being marked dirty, so
+    counters and versions are moved here, not by the flush hooks.
+    """
+    ids = [offer.id for offer, _ in claims]
+    other = aliased(Offer)  # not correlated with the row being updated
+    still_pending = (
+        select(func.count()).select_from(other)
+        .where(other.id.in_(ids), other.status == "pending")
+        .scalar_subquery()
+    )
+    values = {
+        "status": "matched",
+        "matched_with": case({offer.id: partner for offer, partner in claims}, value=Offer.id),
+        "version": Offer.version + 1,
+    }
+    if cycle_id is not None:
+        values["cycle_id"] = cycle_id
+    rows = (await db.execute(
+        update(Offer)
+        .where(Offer.id.in_(ids), still_pending == len(ids))
+        .values(values)
+        .returning(Offer.id, Offer.have_owner, Offer.version)
+        .execution_options(synchronize_session=False)
+    )).all()
+    if len(rows) != len(ids):
+        return False  # 0 rows: the count check makes the statement all or nothing
+
+    versions = {row.id: row.version for row in rows}
+    for offer, partner in claims:
+        for key, value in (
+            ("status", "matched"), ("matched_with", partner), ("version", versions[offer.id]),
+        ):
+            set_committed_value(offer, key, value)
+        if cycle_id is not None:
+            set_committed_value(offer, "cycle_id", cycle_id)
+    await db.run_sync(move_offers, [row.have_owner for row in rows], "pending", "matched")
+    mark_changed(db, ids)
+    return True
+
+
+async def find_reciprocal_match(
+    db: AsyncSession, new_offer: Offer, current_user: str
+) -> Optional[Offer]:
+    """Find and claim a pending offer that has what `new_offer` wants and wants what it has.
+
+    Candidates are re-checked against the rows a chunk at a time, together
+    with the exchange-rate filter (ai.backend.quantity.rate_compatible) and
+    past declines, so a swap of 1 bag for 50 bags, or with a partner who
+    already said no, is passed over for the next candidate.
+
+    The partner returned is already matched to `new_offer` (claim_offers),
+    so two concurrent posts can never both take it; the caller only sets
+    `new_offer`'s side and commits.
+
+    The index only knows offers this process has seen. When it yields no
+    partner, up to MATCH_SQL_FALLBACK_LIMIT pending rows are read straight
+    from ix_offers_match, which finds offers posted by other workers or
+    imported from the command line.
+    """
+    candidates = [cid for cid, owner in reciprocal_candidates(new_offer) if owner != current_user]
+    rate_ok = rate_compatible(new_offer)
+    # 👇 Anti-join: a candidate that declined this offer before has a declined_pairs row
+    usable = DeclinedPair.offer_id.is_(None)
+    if rate_ok is not None:
+        usable = and_(usable, rate_ok)
+    not_declined = and_(DeclinedPair.offer_id == Offer.id, DeclinedPair.other_id == new_offer.id)
+    for start in range(0, len(candidates), RECHECK_CHUNK):
+        chunk = candidates[start:start + RECHECK_CHUNK]
+        rows = (await db.execute(
+            select(Offer, usable.label("usable"))
+            .outerjoin(DeclinedPair, not_declined)
+            .where(Offer.id.in_(chunk), Offer.status == "pending")
+        )).all()
+        found = {offer.id: (offer, ok) for offer, ok in rows}
+        for candidate_id in chunk:
+            if candidate_id not in found:
+                # Row changed behind our back (other worker, manual edit): drop it
+                match_index.discard(candidate_id)
+            elif found[candidate_id][1]:
+                partner = found[candidate_id][0]
+                if await claim_offers(db, [(partner, new_offer.id)]):
+                    return partner
+                match_index.discard(candidate_id)  # taken since the re-check
+
+    # 🔍 Fallback: pending rows this worker's index has never seen
+    limit = settings.MATCH_SQL_FALLBACK_LIMIT
+    if limit <= 0:
+        return None
+    stmt = (
+        select(Offer)
+        .outerjoin(DeclinedPair, not_declined)
+        .where(
+            Offer.have_name == new_offer.want_name,
+            Offer.want_name == new_offer.have_name,
+            Offer.status == "pending",
+            Offer.have_owner != current_user,
+            Offer.id != new_offer.id,
+            usable,
+        )
+        .order_by(Offer.timestamp)
+        .limit(limit)
+    )
+    max_km = settings.MATCH_MAX_DISTANCE_KM
+    if max_km and new_offer.lat is not None:
+        # 📍 Bounding box in SQL, exact distance below; unlocated rows stay eligible
+        dlat = max_km / KM_PER_DEG_LAT
+        dlon = max_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(new_offer.lat)), 0.01))
+        stmt = stmt.where(or_(Offer.lat.is_(None), and_(
+            Offer.lat.between(new_offer.lat - dlat, new_offer.lat + dlat),
+            Offer.lon.between(new_offer.lon - dlon, new_offer.lon + dlon),
+        )))
+    for partner in (await db.execute(stmt)).scalars():
+        match_index.add(partner)  # next time the index has it
+        if (max_km and new_offer.lat is not None and partner.lat is not None
+                and haversine_km(new_offer.lat, new_offer.lon, partner.lat, partner.lon) > max_km):
+            continue
+        if await claim_offers(db, [(partner, new_offer.id)]):
+            match_index.discard(partner.id)
+            return partner
+        match_index.discard(partner.id)
+    return None
+
+
+async def record_decline(db: AsyncSession, offer_id: str, other_id: str):
+    """Remember that these two offers must not be matched again (caller commits)."""
+    await db.execute(
+        insert(DeclinedPair)
+        .values([
+            {"offer_id": offer_id, "other_id": other_id},
+            {"offer_id": other_id, "other_id": offer_id},
+        ])
+        .on_conflict_do_nothing()
+    )
@@ -0,0 +1,47 @@
+"""One-shot copy of accounts from the legacy sqlite3 users.db into the main database.
+
+Usage: python -m ai.backend.migrate_users [path/to/users.db]
+
+Existing usernames in the main database are left untouched, so the
+command is safe to re-run.
+"""
+import sqlite3
+import sys
+
+from sqlalchemy.dialects.sqlite import insert
+
+from ai.backend.database import SessionLocal, init_db
+from ai.backend.models import User
+
+LEGACY_USERS_DB = "users.db"
+BATCH_SIZE = 500
+
+
+def migrate_legacy_users(path: str = LEGACY_USERS_DB) -> int:
+    """Copy (username, password hash) rows; returns how many were inserted."""
+    legacy = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    db = SessionLocal()
+    inserted = 0
+    try:
+        cursor = legacy.execute("SELECT username, password FROM users")
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            result = db.execute(
+                insert(User)
+                .values([{"username": u, "password": p} for u, p in rows])
+                .on_conflict_do_nothing(index_elements=[User.username])
+            )
+            inserted += result.rowcount
+        db.commit()
+    finally:
+        db.close()
+        legacy.close()
+    return inserted
+
+
+if __name__ == "__main__":
+    init_db()
+    path = sys.argv[1] if len(sys.argv) > 1 else LEGACY_USERS_DB
+    print(f"Migrated {migrate_legacy_users(path)} users from {path}")
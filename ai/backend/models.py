@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, DateTime, Float, ForeignKey, Integer, Index
+from sqlalchemy.orm import relationship, column_property
 from ai.backend.database import Base
 from datetime import datetime
 import json
@@ -8,12 +8,26 @@ import json
 class User(Base):
     __tablename__ = "users"
 
-    username = Column(String, primary_key=True, index=True)
+    username = Column(String, primary_key=True, unique=True, index=True)
     password = Column(String)
 
 
 class Offer(Base):
     __tablename__ = "offers"
+    __table_args__ = (
+        # 👇 Reciprocal matching lookup (see ai.backend.matching)
+        Index("ix_offers_match", "have_name", "want_name", "status"),
+        # 👇 Keyset pagination on (timestamp, id) (see ai.backend.pagination)
+        Index("ix_offers_timestamp_id", "timestamp", "id"),
+        Index("ix_offers_owner_timestamp_id", "have_owner", "timestamp", "id"),
+        Index("ix_offers_owner_status_timestamp_id", "have_owner", "status", "timestamp", "id"),
+        # 👇 Nearby lookups by grid cell (see ai.backend.geo)
+        Index("ix_offers_geo_cell_status", "geo_cell", "status"),
+        # 👇 Listing filters on parsed amounts (see ai.backend.quantity)
+        Index("ix_offers_have_qty", "have_name", "have_unit", "have_qty"),
+        # 👇 Oldest offers per status first (see ai.backend.expiry)
+        Index("ix_offers_status_timestamp", "status", "timestamp"),
+    )
 
     # Primary key
     id = Column(String, primary_key=True, index=True)
@@ -21,6 +35,9 @@ class Offer(Base):
     # Have item details
     have_name = Column(String)
     have_quantity = Column(String)
+    # Parsed from have_quantity: amount in a canonical unit (None if unreadable)
+    have_qty = Column(Float, nullable=True)
+    have_unit = Column(String, nullable=True)
     have_category = Column(String)
     have_image = Column(String, nullable=True)
     have_owner = Column(String)
@@ -28,22 +45,29 @@ class Offer(Base):
     # Want item details
     want_name = Column(String)
     want_quantity = Column(String)
+    want_qty = Column(Float, nullable=True)
+    want_unit = Column(String, nullable=True)
     want_category = Column(String)
     want_image = Column(String, nullable=True)
     want_owner = Column(String)
 
     # General offer info
     location = Column(String)
+    # Resolved from `location` by the offline gazetteer (None if unknown)
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    geo_cell = Column(String, nullable=True)
     message = Column(Text, nullable=True)
 
-    # Status tracking
-    status = Column(String, default="pending")
+    # Status tracking (active_history so counters always see the old status)
+    status = column_property(Column(String, default="pending"), active_history=True)
 
     # ✅ Proper DateTime for timestamp
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     # Matching and confirmation details
     matched_with = Column(String, nullable=True)
+    cycle_id = Column(String, nullable=True, index=True)  # set for 3-5 way swaps
     completion_code = Column(String, nullable=True)
     confirmation_code = Column(String, nullable=True)
     confirmed_by = Column(String, nullable=True)
@@ -51,6 +75,9 @@ class Offer(Base):
     # ✅ Decline tracking (store as JSON string in SQLite)
     declined_with = Column(Text, default="[]")
 
+    # Bumped on every change (see ai.backend.offer_cache); the offer's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     # --- Helper methods ---
     def get_declined_with(self):
         try:
@@ -65,8 +92,18 @@ class Offer(Base):
         self.declined_with = json.dumps(declined)
 
 
-    # 👇 Relationship to chat messages
-    chats = relationship("ChatMessage", back_populates="offer", cascade="all, delete-orphan")
+    # 👇 Relationship to chat messages (the database deletes them with the offer)
+    chats = relationship(
+        "ChatMessage", back_populates="offer", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    # 👇 The offer we swap with (matched_with is a plain column, not an FK)
+    partner = relationship(
+        "Offer",
+        primaryjoin="foreign(Offer.matched_with) == remote(Offer.id)",
+        uselist=False,
+        viewonly=True,
+    )
 
     def __repr__(self):
         return (
@@ -75,11 +112,41 @@ class Offer(Base):
         )
 
 
+class DeclinedPair(Base):
+    __tablename__ = "declined_pairs"
+    __table_args__ = (
+        Index("ix_declined_pairs_other_id", "other_id"),
+    )
+
+    # 👇 Stored in both directions, so "did A decline B?" is one primary-key probe
+    offer_id = Column(String, ForeignKey("offers.id", ondelete="CASCADE"), primary_key=True)
+    other_id = Column(String, ForeignKey("offers.id", ondelete="CASCADE"), primary_key=True)
+
+    def __repr__(self):
+        return f"<DeclinedPair(offer={self.offer_id}, other={self.other_id})>"
+
+
+class OfferCounter(Base):
+    __tablename__ = "offer_counters"
+
+    # 👇 Materialized COUNT(*) per owner/status, kept by ai.backend.counters
+    have_owner = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<OfferCounter(owner={self.have_owner}, status={self.status}, count={self.count})>"
+
+
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # 👇 History cursors / WS resume (see ai.backend.chat)
+        Index("ix_chat_messages_offer_timestamp_id", "offer_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    offer_id = Column(String, ForeignKey("offers.id"), index=True)
+    offer_id = Column(String, ForeignKey("offers.id", ondelete="CASCADE"), index=True)
     sender = Column(String, nullable=False)
     content = Column(Text, nullable=False)
 
@@ -91,3 +158,17 @@ class ChatMessage(Base):
 
     def __repr__(self):
         return f"<ChatMessage(id={self.id}, sender={self.sender}, content={self.content[:20]}...)>"
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    # 👇 Ids are never reused, so workers can poll with "id > last seen"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    # 👇 Logged-out tokens, shared by every worker (see ai.backend.revocations)
+    id = Column(Integer, primary_key=True)
+    token_key = Column(String, nullable=False, unique=True)  # token_cache.token_key, never the token
+    exp = Column(Float, nullable=False, index=True)  # rows are dropped once the token expires
+
+    def __repr__(self):
+        return f"<RevokedToken(id={self.id}, exp={self.exp})>"
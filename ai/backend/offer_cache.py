@@ -0,0 +1,194 @@
+"""Response cache and ETags for the public offer reads.
+
+GET /offers and GET /offers/{offer_id} are unauthenticated and hit by every
+landing-page view. Their encoded JSON bodies are kept in a small in-process
+LRU, keyed by path + query string, each with a weak ETag:
+
+- an offer's ETag is its `version`, which every ORM change bumps (flush
+  hook below) and set-based statements bump themselves;
+- a listing's ETag is a hash of its body.
+
+A request whose If-None-Match carries the current ETag gets a bodiless 304.
+
+Invalidation is write-through: when a session commits changes to offers,
+their entries and every cached listing are dropped. Statements that bypass
+the ORM call `response_cache.invalidate` after committing. A worker never
+sees another worker's commits, so entries also expire after
+RESPONSE_CACHE_TTL seconds.
+
+Hit-rate counters are served by GET /metrics/cache.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ai.backend import settings
+from ai.backend.models import Offer
+
+CACHE_CONTROL = "public, no-cache"  # store, but revalidate with the ETag every time
+
+Entry = Tuple[str, bytes]  # (etag, body)
+
+LIST_PREFIX = "/offers?"
+
+
+def offer_key(offer_id: str) -> str:
+    return f"/offers/{offer_id}"
+
+
+def list_key(request: Request) -> str:
+    return LIST_PREFIX + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def list_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def offer_etag(version: Optional[int]) -> str:
+    return f'W/"v{version or 1}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (list or "*")."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()  # sync sessions (CLI, startup) commit off the loop
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Read before querying; `put` ignores bodies read before an invalidation."""
+        return self._generation
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, etag: str, body: bytes, generation: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return  # an offer changed while this body was being built
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, offer_ids: Optional[Iterable[str]] = None):
+        """Drop `offer_ids`' entries and every listing (everything when None)."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if offer_ids is None:
+                self._entries.clear()
+                return
+            drop = {offer_key(offer_id) for offer_id in offer_ids}
+            for key in [k for k in self._entries if k in drop or k.startswith(LIST_PREFIX)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+
+
+def _response(request: Request, etag: str, body: bytes) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cached_response(
+    request: Request, key: str, build: Callable, etag_for: Callable[[dict, bytes], str]
+) -> Response:
+    """Serve `key` from the cache, or call `build()` for the payload and cache it.
+
+    `etag_for(payload, body)` gives the ETag of a freshly built response.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        generation = response_cache.generation
+        payload = await build()
+        body = orjson.dumps(payload)
+        entry = (etag_for(payload, body), body)
+        response_cache.put(key, *entry, generation)
+    return _response(request, *entry)
+
+
+# --- Write-through: versions and invalidation follow the ORM ---
+@event.listens_for(Session, "before_flush")
+def _bump_offer_versions(session, flush_context, instances):
+    touched = session.info.setdefault("offer_cache_ids", set())
+    for obj in session.new:
+        if isinstance(obj, Offer):
+            touched.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Offer) and session.is_modified(obj, include_collections=False):
+            obj.version = (obj.version or 1) + 1
+            touched.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Offer):
+            touched.add(obj.id)
+
+
+def mark_changed(session, offer_ids: Iterable[str]):
+    """Invalidate `offer_ids` when `session` commits (for statements that bypass the ORM)."""
+    session.info.setdefault("offer_cache_ids", set()).update(offer_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    touched = session.info.pop("offer_cache_ids", None)
+    if touched:
+        response_cache.invalidate(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("offer_cache_ids", None)
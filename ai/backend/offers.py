@@ -0,0 +1,61 @@
+"""Offer input schemas and the one place a request becomes an Offer row.
+
+Shared by POST /offers and the bulk importer (ai.backend.bulk), so both
+canonicalize names, resolve locations and parse quantities the same way.
+"""
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from ai.backend.geo import apply_location
+from ai.backend.models import Offer
+from ai.backend.quantity import apply_quantities
+from ai.backend.taxonomy import canonical_item
+
+
+# Pydantic schemas for input
+class Item(BaseModel):
+    name: str
+    quantity: str
+    category: str
+    image: Optional[str] = None
+    owner: Optional[str] = None
+
+class OfferCreate(BaseModel):
+    have_item: Item
+    want_item: Item
+    location: str
+    message: Optional[str] = None
+
+
+def build_offer(offer: OfferCreate, owner: str) -> Offer:
+    """A new pending Offer for `owner` (not added to any session)."""
+    # 🔧 Canonical item names + categories from the taxonomy (data/taxonomy.csv)
+    have_name, have_category = canonical_item(offer.have_item.name)
+    want_name, want_category = canonical_item(offer.want_item.name)
+
+    new_offer = Offer(
+        id=str(uuid.uuid4()),
+        have_name=have_name,
+        have_quantity=offer.have_item.quantity,
+        have_category=have_category,
+        have_image=offer.have_item.image,
+        have_owner=owner,
+        want_name=want_name,
+        want_quantity=offer.want_item.quantity,
+        want_category=want_category,
+        want_image=offer.want_item.image,
+        want_owner=offer.want_item.owner,
+        location=offer.location,
+        message=offer.message,
+        status="pending",
+        timestamp=datetime.utcnow(), # ✅ pass actual datetime object
+    )
+
+    # 📍 Resolve free-text location to lat/lon + grid cell (offline gazetteer)
+    apply_location(new_offer)
+    # 🔧 Parse "2 bags" / "50kg" into amount + canonical unit
+    apply_quantities(new_offer)
+    return new_offer
@@ -0,0 +1,84 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Row, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.backend.models import Offer
+
+
+# --- Opaque cursors: base64(json([...])) of the sort key of the last row on a page ---
+def encode_key(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_key(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def encode_cursor(offer: Offer) -> str:
+    ts = offer.timestamp.isoformat() if offer.timestamp else None
+    return encode_key([ts, offer.id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        ts, offer_id = decode_key(cursor)
+        return datetime.fromisoformat(ts), str(offer_id)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    total: Optional[int] = None,
+) -> Tuple[List[Row], dict]:
+    """Page a select() over Offer columns, ordered by (timestamp, id).
+
+    With a `cursor` the page is fetched by keyset (`(timestamp, id) > cursor`),
+    so every page costs the same index seek. Without one we fall back to
+    OFFSET for clients still paging by number. `total` comes from the
+    materialized counters (ai.backend.counters), never from COUNT(*).
+    """
+    if page < 1:
+        page = 1
+    page_size = max(page_size, 1)
+
+    stmt = stmt.order_by(Offer.timestamp, Offer.id)
+    if cursor:
+        ts, last_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Offer.timestamp, Offer.id) > tuple_(ts, last_id))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+
+    # One extra row tells us whether there is a next page without counting
+    rows = (await db.execute(stmt.limit(page_size + 1))).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    meta = {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+        "next_page": page + 1 if has_more else None,
+        "prev_page": page - 1 if page > 1 else None,
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
+    return rows, meta
@@ -0,0 +1,107 @@
+"""Argon2 hashing off the event loop, on a bounded executor of its own.
+
+Argon2 is deliberately slow and memory hungry. Running it on Starlette's
+shared threadpool lets a burst of logins starve every other sync dependency,
+so hashes run on a dedicated pool (threads by default; argon2-cffi releases
+the GIL, but a process pool is available via AFROMARKET_PASSWORD_EXECUTOR).
+Requests beyond PASSWORD_MAX_PENDING are refused with 503 instead of queueing
+without bound.
+"""
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from ai.backend import settings
+
+# ✅ Use Argon2 only (no bcrypt at all); cost comes from settings so it can be
+# tuned per deployment. Hashes made with older parameters are upgraded on login.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    default="argon2",
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+
+# Module-level so a process pool can pickle them by reference
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify, and return a fresh hash if `hashed` used outdated parameters."""
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """Bounded async front for the hashing executor."""
+
+    def __init__(self, workers: int, kind: str = "thread", max_pending: Optional[int] = None):
+        self.workers = max(workers, 1)
+        self.kind = kind
+        self.max_pending = max_pending if max_pending is not None else self.workers * 8
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="argon2"
+                        )
+        return self._executor
+
+    async def run(self, fn, *args):
+        # 👇 Backpressure: shed load once the queue is full rather than let
+        # every waiting login hold a connection open until it times out
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self.run(verify_password, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update, password, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_WORKERS,
+    kind=settings.PASSWORD_EXECUTOR,
+    max_pending=settings.PASSWORD_MAX_PENDING,
+)
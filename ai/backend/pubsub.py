@@ -0,0 +1,178 @@
+"""Chat room pub/sub between uvicorn workers.
+
+Sockets live in one process, so a message posted on worker A must be handed
+to the broadcaster on every other worker too. Backends:
+
+- "local":  single process; publish goes straight to the broadcaster.
+- "sqlite": no external service. Workers append events to a small shared
+  SQLite log (WAL mode) and tail it every few milliseconds. Each event is
+  delivered locally right away and skipped by its own worker when read back.
+
+Pick one with AFROMARKET_CHAT_PUBSUB.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Callable, Optional
+
+import aiosqlite
+import orjson
+
+from ai.backend import settings
+from ai.backend.broadcast import broadcaster
+
+logger = logging.getLogger(__name__)
+
+# handler(room_id, text): text is the already-serialized JSON message
+Handler = Callable[[str, str], object]
+
+WRITE_RETRIES = 5
+
+
+class LocalPubSub:
+    def __init__(self, handler: Handler):
+        self._handler = handler
+
+    async def start(self):
+        pass
+
+    async def publish(self, room_id: str, message: dict):
+        self._handler(room_id, orjson.dumps(message).decode())
+
+    async def stop(self):
+        pass
+
+
+class SQLitePubSub(LocalPubSub):
+    def __init__(
+        self, handler: Handler, path: str, poll_interval: float = 0.05, retention: float = 60.0
+    ):
+        super().__init__(handler)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._db: Optional[aiosqlite.Connection] = None  # tail (reads)
+        self._writer: Optional[aiosqlite.Connection] = None  # publish + retention
+        self._write_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_seq = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # Autocommit: transactions are only the ones we open explicitly
+        db = await aiosqlite.connect(self.path, isolation_level=None)
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("PRAGMA synchronous=NORMAL")
+        await db.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        return db
+
+    async def start(self):
+        # 👇 Separate read and write connections: a poll that is still reading
+        # holds a snapshot, and SQLite cannot upgrade it to a write lock (the
+        # INSERT would fail with "database is locked" without waiting)
+        self._db = await self._connect()
+        self._writer = await self._connect()
+        await self._writer.execute(
+            "CREATE TABLE IF NOT EXISTS chat_events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " origin TEXT NOT NULL, room_id TEXT NOT NULL,"
+            " payload TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        # 👇 Only events published after we joined; history comes from the DB
+        async with self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM chat_events") as cur:
+            self._last_seq = (await cur.fetchone())[0]
+        self._task = asyncio.create_task(self._tail())
+
+    async def _write(self, sql: str, params: tuple):
+        """Run one write in a BEGIN IMMEDIATE transaction, retrying while busy.
+
+        BEGIN IMMEDIATE takes the write lock up front, so busy_timeout applies;
+        the retries cover the rare SQLITE_BUSY that still gets through.
+        """
+        async with self._write_lock:
+            for attempt in range(WRITE_RETRIES):
+                try:
+                    await self._writer.execute("BEGIN IMMEDIATE")
+                except sqlite3.OperationalError as exc:
+                    if "locked" not in str(exc) and "busy" not in str(exc):
+                        raise
+                    if attempt == WRITE_RETRIES - 1:
+                        raise
+                    await asyncio.sleep(0.01 * 2 ** attempt)
+                    continue
+                try:
+                    await self._writer.execute(sql, params)
+                    await self._writer.execute("COMMIT")
+                except BaseException:
+                    await self._writer.execute("ROLLBACK")
+                    raise
+                return
+
+    async def publish(self, room_id: str, message: dict):
+        text = orjson.dumps(message).decode()
+        self._handler(room_id, text)
+        if self._writer is None:
+            # Not started (e.g. app run without its startup hooks): local only
+            return
+        await self._write(
+            "INSERT INTO chat_events (origin, room_id, payload, created) VALUES (?, ?, ?, ?)",
+            (self.origin, room_id, text, time.time()),
+        )
+
+    async def _tail(self):
+        polls = 0
+        while True:
+            try:
+                async with self._db.execute(
+                    "SELECT seq, origin, room_id, payload FROM chat_events"
+                    " WHERE seq > ? ORDER BY seq",
+                    (self._last_seq,),
+                ) as cur:
+                    rows = await cur.fetchall()
+                for seq, origin, room_id, payload in rows:
+                    self._last_seq = seq
+                    if origin != self.origin:
+                        self._handler(room_id, payload)
+                polls += 1
+                if polls % 200 == 0:
+                    await self._write(
+                        "DELETE FROM chat_events WHERE created < ?",
+                        (time.time() - self.retention,),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat pub/sub poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for db in (self._db, self._writer):
+            if db is not None:
+                await db.close()
+        self._db = self._writer = None
+
+
+def create_pubsub(handler: Handler, backend: str = settings.CHAT_PUBSUB):
+    if backend == "local":
+        return LocalPubSub(handler)
+    if backend == "sqlite":
+        return SQLitePubSub(
+            handler,
+            settings.CHAT_PUBSUB_PATH,
+            poll_interval=settings.CHAT_PUBSUB_POLL_MS / 1000,
+            retention=settings.CHAT_PUBSUB_RETENTION,
+        )
+    raise ValueError(f"Unknown chat pub/sub backend: {backend!r}")
+
+
+chat_bus = create_pubsub(broadcaster.publish_text)
@@ -0,0 +1,250 @@
+"""Structured offer quantities.
+
+`have_quantity` / `want_quantity` stay as the text the user typed ("2 bags",
+"50kg", "half basket"). Alongside, we store the amount in a canonical unit
+(have_qty + have_unit, want_qty + want_unit) from data/units.csv: weights
+become kg, volumes litres, and trade units (bag, tuber, crate, ...) stay
+countable units of their own, since a bag of rice and a bag of yam do not
+convert. Text we cannot read leaves both columns NULL.
+
+The numeric columns let matching reject swaps whose exchange rates disagree
+and let listings filter by amount, in SQL.
+
+The migration that adds the columns fills them with a frozen copy of the
+parser. Refresh stored offers after a parser or units.csv change with:
+python -m ai.backend.quantity
+"""
+import csv
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from ai.backend import settings
+from ai.backend.models import Offer
+from ai.backend.offer_cache import response_cache
+
+UNITS_PATH = os.path.join(os.path.dirname(__file__), "data", "units.csv")
+
+Quantity = Tuple[Optional[float], Optional[str]]
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "half": 0.5, "quarter": 0.25,
+}
+# 👇 Number words we do not compose ("five hundred"): the text is rejected, not guessed
+UNSUPPORTED_NUMBER_WORDS = {
+    "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+    "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety",
+    "hundred", "hundreds", "thousand", "thousands", "million", "millions", "billion",
+}
+
+# 👇 Numbers ("1,000", "1,5", "2.5", "1/2"), words and dashes; glued units allowed ("50kg")
+_TOKEN = re.compile(
+    r"(?P<num>\d{1,3}(?:,\d{3})+(?![\d,])"   # thousands: 1,000  12,500
+    r"|\d+,\d{1,2}(?!\d)"                     # decimal comma: 1,5  2,25
+    r"|\d+(?:\.\d+)?(?:/\d+)?)"                # 2  2.5  1/2
+    r"|(?P<word>[a-z]+)|(?P<dash>-)"
+)
+_TIMES = {"x", "by"}
+_RANGE = {"to"}
+_ARTICLES = {"a", "an"}
+
+
+def load_units(path: str = UNITS_PATH) -> Dict[str, Tuple[str, float]]:
+    units = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            units[row["alias"].strip().lower()] = (row["unit"], float(row["factor"]))
+    return units
+
+
+UNITS = load_units()
+
+
+def _number(token: str) -> Optional[float]:
+    if token[0].isdigit():
+        if "/" in token:
+            num, den = token.split("/")
+            return float(num) / float(den) if float(den) else None  # 1/0 is unreadable
+        if re.fullmatch(r"\d+,\d{1,2}", token):
+            return float(token.replace(",", "."))
+        return float(token.replace(",", ""))
+    return NUMBER_WORDS.get(token)
+
+
+def parse_quantity(text: Optional[str]) -> Quantity:
+    """(amount, canonical unit) for free text, or (None, None).
+
+    "2 bags" -> (2, "bag"), "500g" -> (0.5, "kg"), "half basket" ->
+    (0.5, "basket"), "2 x 50kg" -> (100, "kg"), "10-20 kg" -> (10, "kg").
+    Numbers multiply only across "x" / "by"; a range ("10-20", "10 to 20")
+    keeps its lower bound, and two numbers with nothing between them are
+    ambiguous, so the text stays unparsed. One-letter units ("g", "l", "t")
+    count only right after a number, so "don't know" is not a tonne. A bare
+    number counts pieces and a bare unit means one of it.
+
+    Input that would need a guess is rejected: number words we do not
+    compose ("five hundred kg"), a zero denominator ("1/0 kg") and a number
+    followed only by words that are not units ("100 naira").
+    """
+    if not text:
+        return None, None
+    text = text.lower()
+    value = None
+    weak = False  # value came from "a"/"an": a following number replaces it
+    unknown = False  # a non-unit word followed the amount ("100 naira")
+    last, last_end = None, 0  # kind of the previous token ("num", "times", "range", "word")
+    for match in _TOKEN.finditer(text):
+        token = match.group()
+        after_number = last == "num" and not text[last_end:match.start()].strip(" -")
+        last_end = match.end()
+        if match.group("dash") or token in _RANGE:
+            if last == "num":
+                last = "range"
+            continue
+        if token in _TIMES:
+            if value is not None:
+                last = "times"
+            continue
+        unit = UNITS.get(token)
+        if unit is not None and (len(token) > 1 or after_number):
+            amount = (1.0 if value is None else value) * unit[1]
+            return (amount, unit[0]) if amount > 0 else (None, None)
+        if token in _ARTICLES and value is not None:
+            continue  # "half a bag"
+        if token in UNSUPPORTED_NUMBER_WORDS:
+            return None, None
+        number = _number(token)
+        if number is None:
+            if match.group("num"):
+                return None, None  # "1/0"
+            # other words ("3 big bags", "bags of") are skipped, but need a unit later
+            if value is not None and not weak:
+                unknown = True
+            if last != "range":
+                last = "word"
+            continue
+        if last == "range":
+            pass  # upper bound of "10-20": keep the lower one
+        elif value is None or weak:
+            value = number
+        elif last == "times":
+            value *= number
+        else:
+            return None, None  # "2 50kg bags": which number is the amount?
+        weak = token in _ARTICLES
+        last = "num"
+    if value is not None and value > 0 and not unknown:
+        return value, "piece"
+    return None, None
+
+
+def apply_quantities(offer) -> None:
+    """Fill the structured quantity columns from the free-text quantities."""
+    offer.have_qty, offer.have_unit = parse_quantity(offer.have_quantity)
+    offer.want_qty, offer.want_unit = parse_quantity(offer.want_quantity)
+
+
+def reparse_quantities(db: Session) -> int:
+    """Re-parse stored quantity texts into have_qty/unit and want_qty/unit.
+
+    Works per distinct text rather than per row, so each spelling costs at
+    most one UPDATE, and only rows whose stored values differ are touched.
+    Returns the number of offer fields changed. Cached offer responses in
+    running servers expire within RESPONSE_CACHE_TTL.
+    """
+    changed = 0
+    for text_col, qty_col, unit_col in (
+        (Offer.have_quantity, Offer.have_qty, Offer.have_unit),
+        (Offer.want_quantity, Offer.want_qty, Offer.want_unit),
+    ):
+        texts = db.execute(select(text_col).distinct().where(text_col.is_not(None))).scalars().all()
+        for text in texts:
+            value, unit = parse_quantity(text)
+            stmt = (
+                update(Offer)
+                .where(text_col == text)
+                .where(or_(qty_col.is_distinct_from(value), unit_col.is_distinct_from(unit)))
+                .values({qty_col.key: value, unit_col.key: unit, Offer.version.key: Offer.version + 1})
+                .execution_options(synchronize_session=False)
+            )
+            changed += db.execute(stmt).rowcount
+        db.commit()
+    response_cache.invalidate()
+    return changed
+
+
+def rate_compatible(new_offer, max_ratio: float = settings.QUANTITY_MAX_RATIO):
+    """SQL filter: candidates whose exchange rate agrees with `new_offer`'s.
+
+    `new_offer` gives have_qty of A for want_qty of B; a candidate gives
+    have_qty of B for want_qty of A. The swap is kept when the two rates are
+    within `max_ratio` of each other. Candidates (or a new offer) whose units
+    are unknown or differ pass, since there is nothing to compare. None when
+    there is no filter to apply.
+    """
+    a, b = new_offer.have_qty, new_offer.want_qty
+    if not max_ratio or a is None or b is None:
+        return None
+    # B per A: ours b / a, theirs have_qty / want_qty, compared cross-multiplied
+    ours = Offer.have_qty * a
+    theirs = Offer.want_qty * b
+    return or_(
+        Offer.have_qty.is_(None),
+        Offer.want_qty.is_(None),
+        Offer.have_unit != new_offer.want_unit,
+        Offer.want_unit != new_offer.have_unit,
+        and_(ours <= theirs * max_ratio, theirs <= ours * max_ratio),
+    )
+
+
+def rates_agree(new_offer, other, max_ratio: float = settings.QUANTITY_MAX_RATIO) -> bool:
+    """In-Python twin of `rate_compatible`, for offers already loaded."""
+    a, b = new_offer.have_qty, new_offer.want_qty
+    if not max_ratio or a is None or b is None:
+        return True
+    if other.have_qty is None or other.want_qty is None:
+        return True
+    if other.have_unit != new_offer.want_unit or other.want_unit != new_offer.have_unit:
+        return True
+    ours, theirs = other.have_qty * a, other.want_qty * b
+    return ours <= theirs * max_ratio and theirs <= ours * max_ratio
+
+
+def parse_bound(text: Optional[str], name: str) -> Quantity:
+    """A min/max query parameter such as "50kg" or "2 bags" (400 if unreadable)."""
+    if text is None:
+        return None, None
+    value, unit = parse_quantity(text)
+    if value is None:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {text!r}")
+    return value, unit
+
+
+def quantity_filters(min_text: Optional[str], max_text: Optional[str]) -> list:
+    """WHERE clauses on the have side for `min_quantity` / `max_quantity`."""
+    low, high = parse_bound(min_text, "min_quantity"), parse_bound(max_text, "max_quantity")
+    if low[1] and high[1] and low[1] != high[1]:
+        raise HTTPException(status_code=400, detail="min_quantity and max_quantity units differ")
+    clauses = []
+    if low[1]:
+        clauses += [Offer.have_unit == low[1], Offer.have_qty >= low[0]]
+    if high[1]:
+        clauses += [Offer.have_unit == high[1], Offer.have_qty <= high[0]]
+    return clauses
+
+
+if __name__ == "__main__":
+    from ai.backend.database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Re-parsed {reparse_quantities(db)} offer quantity fields")
+    finally:
+        db.close()
@@ -0,0 +1,98 @@
+"""Token revocations shared between uvicorn workers.
+
+The token cache (token_cache.py) lives in one process, so a logout used to
+turn the token away only on the worker that served it; the others kept
+accepting it until it expired (30 days for a refresh token). POST
+/auth/logout now also writes the token's key to the revoked_tokens table,
+and a background task on every worker reads new rows every
+TOKEN_REVOCATION_POLL_SECONDS and revokes them in its own cache. A logged
+out token can therefore still pass on another worker for up to one poll
+interval.
+
+Rows are deleted once their token has expired: by then the signature check
+rejects it anyway. A poll only writes when a cheap read finds such rows. A worker that starts (or restarts) loads every row that
+is still live.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.backend.database import AsyncSessionLocal
+from ai.backend.models import RevokedToken
+from ai.backend.token_cache import TokenCache, token_key
+
+logger = logging.getLogger(__name__)
+
+
+async def record_revocation(db: AsyncSession, token: str, exp: float):
+    """Store a revocation for the other workers (commits)."""
+    await db.execute(
+        insert(RevokedToken)
+        .values(token_key=token_key(token), exp=exp)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.token_key])
+    )
+    await db.commit()
+
+
+class RevocationPoller:
+    """Copies new revoked_tokens rows into `cache` every `interval` seconds."""
+
+    def __init__(self, cache: TokenCache, interval: float):
+        self.cache = cache
+        self.interval = interval
+        self.last_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll(self) -> int:
+        """Apply rows added since the last poll. Returns how many were read."""
+        now = time.time()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(RevokedToken.id, RevokedToken.token_key, RevokedToken.exp)
+                .where(RevokedToken.id > self.last_id, RevokedToken.exp > now)
+                .order_by(RevokedToken.id)
+            )).all()
+            # 👇 Prune only when a read (one seek on the exp index) finds
+            # something, so quiet polls never take the write lock
+            expired = (await db.execute(
+                select(RevokedToken.id).where(RevokedToken.exp <= now).limit(1)
+            )).first()
+            if expired is not None:
+                await db.execute(delete(RevokedToken).where(RevokedToken.exp <= now))
+                await db.commit()
+        for row in rows:
+            self.cache.revoke_key(row.token_key, row.exp)
+        if rows:
+            self.last_id = rows[-1].id
+        return len(rows)
+
+    async def start(self):
+        if self.interval <= 0:
+            return
+        # 👇 Load live revocations before serving, not one interval later
+        await self.poll()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception:
+                # A locked database must not stop the poller
+                logger.exception("Token revocation poll failed")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
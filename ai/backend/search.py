@@ -0,0 +1,176 @@
+"""Full-text search over offers (SQLite FTS5).
+
+`offers_fts` is an external-content FTS5 table over offers.have_name,
+want_name, location and message, keyed by the offers rowid. Triggers keep
+it in sync with every insert, update and delete, whether it comes from the
+ORM or a set-based statement, so the write paths need no extra code.
+
+Offers have a string primary key, so their rowids can be renumbered by
+VACUUM. Rebuild the index after one with: python -m ai.backend.search
+"""
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Row, column, func, literal_column, select, table, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.backend.models import Offer
+from ai.backend.pagination import decode_key, encode_key
+from ai.backend.serializers import offer_columns
+
+FTS_COLUMNS = ("have_name", "want_name", "location", "message")
+
+# bm25 column weights, in FTS_COLUMNS order: item names matter most
+RANK_WEIGHTS = (10.0, 10.0, 2.0, 1.0)
+
+SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS offers_fts USING fts5(
+        have_name, want_name, location, message,
+        content='offers', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS offers_fts_ai AFTER INSERT ON offers BEGIN
+        INSERT INTO offers_fts (rowid, have_name, want_name, location, message)
+        VALUES (new.rowid, new.have_name, new.want_name, new.location, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS offers_fts_ad AFTER DELETE ON offers BEGIN
+        INSERT INTO offers_fts (offers_fts, rowid, have_name, want_name, location, message)
+        VALUES ('delete', old.rowid, old.have_name, old.want_name, old.location, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS offers_fts_au
+    AFTER UPDATE OF have_name, want_name, location, message ON offers BEGIN
+        INSERT INTO offers_fts (offers_fts, rowid, have_name, want_name, location, message)
+        VALUES ('delete', old.rowid, old.have_name, old.want_name, old.location, old.message);
+        INSERT INTO offers_fts (rowid, have_name, want_name, location, message)
+        VALUES (new.rowid, new.have_name, new.want_name, new.location, new.message);
+    END
+    """,
+]
+
+offers_fts = table("offers_fts", column("rowid"))
+_fts = literal_column("offers_fts")
+_offer_rowid = literal_column("offers.rowid")
+_rank = func.bm25(_fts, *RANK_WEIGHTS)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+SEARCH_TRIGGERS = ("offers_fts_ai", "offers_fts_ad", "offers_fts_au")
+
+
+def install_search(connection) -> bool:
+    """Create the FTS table and triggers if missing (sync connection).
+
+    Returns True when the index has been (re)filled from offers: the table
+    was new, or a trigger was missing. Rebuilding `offers` (e.g. a
+    batch_alter_table downgrade) drops its triggers and renumbers rowids,
+    so the old index no longer matches and writes stopped reaching it.
+    """
+    names = set(connection.execute(
+        text(
+            "SELECT name FROM sqlite_master WHERE (type = 'table' AND name = 'offers_fts')"
+            " OR (type = 'trigger' AND tbl_name = 'offers')"
+        )
+    ).scalars())
+    intact = "offers_fts" in names and names.issuperset(SEARCH_TRIGGERS)
+    for ddl in SEARCH_DDL:
+        connection.execute(text(ddl))
+    if not intact:
+        rebuild_search(connection)
+    return not intact
+
+
+def rebuild_search(connection):
+    connection.execute(text("INSERT INTO offers_fts (offers_fts) VALUES ('rebuild')"))
+
+
+def build_match(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    "yam lag" -> '"yam"* "lag"*'. Quoting each token keeps FTS5 operators
+    and punctuation in user input from being parsed as query syntax.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens[:16])
+
+
+async def search_offers(
+    db: AsyncSession,
+    query: str,
+    status: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Row], Optional[str]]:
+    """Best matches first (bm25), keyset-paged on (rank, rowid).
+
+    The cursor also carries the highest offers rowid when the first page ran,
+    and later pages skip rows above it, so offers posted while a client
+    pages cannot push earlier results onto the next page. bm25 scores still
+    depend on corpus statistics, so heavy writes between pages can move a
+    row near a page boundary by one page; such paging is best-effort, not a
+    snapshot.
+
+    Returns (rows of offer columns, next_cursor).
+    """
+    match = build_match(query)
+    if match is None:
+        return [], None
+
+    # 👇 Rank inside the FTS table first and join only the page to offers;
+    # joining every match before sorting costs a row lookup per hit
+    page = (
+        select(offers_fts.c.rowid.label("offer_rowid"), _rank.label("rank"))
+        .where(_fts.op("MATCH")(match))
+    )
+    if status:
+        page = page.join(Offer.__table__, _offer_rowid == offers_fts.c.rowid).where(
+            Offer.status == status
+        )
+    if cursor:
+        try:
+            last_rank, last_rowid, snapshot = decode_key(cursor)
+            key = (float(last_rank), int(last_rowid))
+            snapshot = int(snapshot)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page = page.where(tuple_(_rank, offers_fts.c.rowid) > tuple_(*key))
+    else:
+        # 📍 Offers inserted from now on get larger rowids and stay off later pages
+        snapshot = (await db.execute(
+            select(func.max(_offer_rowid)).select_from(Offer.__table__)
+        )).scalar() or 0
+    page = page.where(offers_fts.c.rowid <= snapshot)
+    page = page.order_by(_rank, offers_fts.c.rowid).limit(limit + 1).subquery()
+
+    stmt = (
+        select(*offer_columns(), page.c.rank, page.c.offer_rowid)
+        .select_from(page)
+        .join(Offer.__table__, _offer_rowid == page.c.offer_rowid)
+        .order_by(page.c.rank, page.c.offer_rowid)
+    )
+    rows = (await db.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_key([rows[-1].rank, rows[-1].offer_rowid, snapshot]) if has_more else None
+    return rows, next_cursor
+
+
+if __name__ == "__main__":
+    from ai.backend.database import engine, init_db
+
+    init_db()
+    with engine.begin() as connection:
+        if not install_search(connection):
+            rebuild_search(connection)
+    print("Rebuilt offers_fts")
@@ -0,0 +1,41 @@
+from typing import Any, Dict, Sequence
+
+from ai.backend.models import Offer
+
+# 👇 Column order is fixed once at import; rows are mapped with a single zip
+OFFER_COLUMNS = tuple(Offer.__table__.columns)
+OFFER_KEYS = tuple(c.key for c in OFFER_COLUMNS)
+
+# 🔧 Badge lookup table (was an if/elif chain per row)
+BADGES = {
+    "pending": "🟢 Pending",
+    "matched": "🟡 Matched",
+    "completed": "🔴 Completed",
+    "declined": "🔴 Declined",
+    "expired": "⚪ Expired",
+}
+
+
+def badge_for_status(status: str) -> str:
+    return BADGES.get(status, status)
+
+
+def offer_columns(entity=Offer, prefix: str = ""):
+    """Column list for `db.query(...)` / `select(...)`, optionally labelled."""
+    if not prefix:
+        return [getattr(entity, key) for key in OFFER_KEYS]
+    return [getattr(entity, key).label(prefix + key) for key in OFFER_KEYS]
+
+
+def offer_row(row: Sequence[Any], start: int = 0) -> Dict[str, Any]:
+    """Map a column tuple (as selected by `offer_columns`) to an offer payload."""
+    data = dict(zip(OFFER_KEYS, row[start:start + len(OFFER_KEYS)]))
+    data["badge"] = BADGES.get(data["status"], data["status"])
+    return data
+
+
+def offer_dict(offer: Offer) -> Dict[str, Any]:
+    """Same payload as `offer_row`, for ORM objects the endpoint already holds."""
+    data = {key: getattr(offer, key) for key in OFFER_KEYS}
+    data["badge"] = BADGES.get(data["status"], data["status"])
+    return data
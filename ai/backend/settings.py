@@ -0,0 +1,112 @@
+import os
+
+from dotenv import load_dotenv
+
+# 👇 Environment (or a .env file next to where uvicorn starts) overrides defaults
+load_dotenv()
+
+_AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# --- Database ---
+DATABASE_URL = os.getenv(
+    "AFROMARKET_DATABASE_URL", f"sqlite:///{os.path.join(_AI_DIR, 'afromarket.db')}"
+)
+ASYNC_DATABASE_URL = os.getenv(
+    "AFROMARKET_ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+)
+
+DB_POOL_SIZE = _env_int("AFROMARKET_DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("AFROMARKET_DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _env_float("AFROMARKET_DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = _env_int("AFROMARKET_DB_POOL_RECYCLE", 3600)
+DB_ECHO = os.getenv("AFROMARKET_DB_ECHO", "0") == "1"
+
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("AFROMARKET_SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("AFROMARKET_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = _env_int("AFROMARKET_SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_MMAP_SIZE = _env_int("AFROMARKET_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+SQLITE_CACHE_SIZE = _env_int("AFROMARKET_SQLITE_CACHE_SIZE", -64000)  # negative = KiB
+SQLITE_FOREIGN_KEYS = os.getenv("AFROMARKET_SQLITE_FOREIGN_KEYS", "ON")  # ON DELETE CASCADE needs it
+
+# --- Passwords (Argon2) ---
+ARGON2_TIME_COST = _env_int("AFROMARKET_ARGON2_TIME_COST", 3)
+ARGON2_MEMORY_COST_KIB = _env_int("AFROMARKET_ARGON2_MEMORY_COST_KIB", 65536)
+ARGON2_PARALLELISM = _env_int("AFROMARKET_ARGON2_PARALLELISM", 4)
+
+# Dedicated executor for hashing so logins cannot starve the default threadpool
+PASSWORD_EXECUTOR = os.getenv("AFROMARKET_PASSWORD_EXECUTOR", "thread")  # or "process"
+PASSWORD_WORKERS = _env_int("AFROMARKET_PASSWORD_WORKERS", os.cpu_count() or 2)
+PASSWORD_MAX_PENDING = _env_int("AFROMARKET_PASSWORD_MAX_PENDING", PASSWORD_WORKERS * 8)
+
+# --- Auth ---
+TOKEN_CACHE_SIZE = _env_int("AFROMARKET_TOKEN_CACHE_SIZE", 10000)  # 0 disables
+# Logouts are stored in revoked_tokens; other workers honour them within this
+TOKEN_REVOCATION_POLL_SECONDS = _env_float("AFROMARKET_TOKEN_REVOCATION_POLL_SECONDS", 2.0)
+
+# --- Chat ---
+CHAT_SEND_QUEUE_SIZE = _env_int("AFROMARKET_CHAT_SEND_QUEUE_SIZE", 64)  # messages per socket
+CHAT_SEND_TIMEOUT = _env_float("AFROMARKET_CHAT_SEND_TIMEOUT", 5.0)  # seconds per send
+
+# Cross-worker chat fan-out: "local" (one worker) or "sqlite" (shared log file)
+CHAT_PUBSUB = os.getenv("AFROMARKET_CHAT_PUBSUB", "local")
+CHAT_PUBSUB_PATH = os.getenv("AFROMARKET_CHAT_PUBSUB_PATH", os.path.join(_AI_DIR, "chat_bus.db"))
+CHAT_PUBSUB_POLL_MS = _env_int("AFROMARKET_CHAT_PUBSUB_POLL_MS", 20)
+CHAT_PUBSUB_RETENTION = _env_float("AFROMARKET_CHAT_PUBSUB_RETENTION", 60.0)  # seconds
+
+# Group commit for chat messages: flush every N rows or after this many ms
+CHAT_WRITE_BATCH = _env_int("AFROMARKET_CHAT_WRITE_BATCH", 256)
+CHAT_WRITE_DELAY_MS = _env_float("AFROMARKET_CHAT_WRITE_DELAY_MS", 5.0)
+
+# --- Location-aware matching ---
+GEO_CELL_DEG = _env_float("AFROMARKET_GEO_CELL_DEG", 0.5)  # ~55 km grid cells
+# Reciprocal matches further apart than this are skipped; 0 = rank by distance only
+MATCH_MAX_DISTANCE_KM = _env_float("AFROMARKET_MATCH_MAX_DISTANCE_KM", 150.0)
+# Rows read from ix_offers_match when the in-process index has no usable partner
+# (offers posted by other workers or by CLI imports are not in this worker's index)
+MATCH_SQL_FALLBACK_LIMIT = _env_int("AFROMARKET_MATCH_SQL_FALLBACK_LIMIT", 32)
+
+# --- Item taxonomy ---
+TAXONOMY_PATH = os.getenv(
+    "AFROMARKET_TAXONOMY_PATH", os.path.join(_AI_DIR, "backend", "data", "taxonomy.csv")
+)
+# How often the file's mtime is checked for hot reload; negative disables reloading
+TAXONOMY_RELOAD_SECONDS = _env_float("AFROMARKET_TAXONOMY_RELOAD_SECONDS", 5.0)
+TAXONOMY_FUZZY_CUTOFF = _env_float("AFROMARKET_TAXONOMY_FUZZY_CUTOFF", 0.85)
+
+# --- Quantity-aware matching ---
+# Reciprocal swaps whose exchange rates differ by more than this factor are skipped; 0 = off
+QUANTITY_MAX_RATIO = _env_float("AFROMARKET_QUANTITY_MAX_RATIO", 2.0)
+
+# --- Bulk import ---
+BULK_BATCH_SIZE = _env_int("AFROMARKET_BULK_BATCH_SIZE", 500)  # rows per transaction
+BULK_CANDIDATES = _env_int("AFROMARKET_BULK_CANDIDATES", 16)  # pool candidates checked per row
+
+# --- Exports ---
+EXPORT_BATCH_SIZE = _env_int("AFROMARKET_EXPORT_BATCH_SIZE", 1000)  # rows per cursor fetch
+
+# --- Offer expiry ---
+# Pending offers older than this are marked "expired"; 0 disables expiry
+OFFER_TTL_HOURS = _env_float("AFROMARKET_OFFER_TTL_HOURS", 30 * 24)
+# Expired offers older than this (since posting) are deleted; 0 keeps them
+OFFER_PURGE_HOURS = _env_float("AFROMARKET_OFFER_PURGE_HOURS", 0)
+# Purged offers are appended here as NDJSON first; empty = no archive
+OFFER_ARCHIVE_PATH = os.getenv("AFROMARKET_OFFER_ARCHIVE_PATH", "")
+EXPIRY_INTERVAL_SECONDS = _env_float("AFROMARKET_EXPIRY_INTERVAL_SECONDS", 300.0)
+EXPIRY_BATCH_SIZE = _env_int("AFROMARKET_EXPIRY_BATCH_SIZE", 500)  # rows per transaction
+EXPIRY_BATCH_PAUSE_MS = _env_float("AFROMARKET_EXPIRY_BATCH_PAUSE_MS", 50.0)  # between batches
+
+# --- Response cache for public offer reads (GET /offers, /offers/{id}) ---
+RESPONSE_CACHE_SIZE = _env_int("AFROMARKET_RESPONSE_CACHE_SIZE", 1024)  # entries; 0 = ETags only
+# Other workers' writes are not seen by this worker's cache: bound the staleness
+RESPONSE_CACHE_TTL = _env_float("AFROMARKET_RESPONSE_CACHE_TTL", 5.0)  # seconds
@@ -0,0 +1,219 @@
+"""Item taxonomy: canonical item names and categories.
+
+Offers used to store whatever the client typed (lowercased), so "Cassava",
+"casava" and "manioc" were three different items to the matcher, and the
+category came from a few hard-coded lists. The taxonomy now lives in
+data/taxonomy.csv (name, category, synonyms) and is compiled once into:
+
+- a dict of every normalized name and synonym -> (canonical, category);
+- a word trie of the same phrases, so "fresh palm oil" still gets the
+  Oils category from the longest known phrase inside it;
+- fuzzy fallback (difflib) for near misses such as "casava" or "tomatos".
+
+Editing the file takes effect without a restart: it is re-checked at most
+every TAXONOMY_RELOAD_SECONDS and recompiled when its mtime changes.
+
+Re-normalize existing offers with: python -m ai.backend.taxonomy
+"""
+import csv
+import difflib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ai.backend import settings
+from ai.backend.models import Offer
+from ai.backend.offer_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+MISC = "Misc"
+FUZZY_MIN_LENGTH = 4  # shorter words have too many near neighbours
+_CACHE_SIZE = 10_000
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+Entry = Tuple[str, str]  # (canonical name, category)
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse spaces."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class Taxonomy:
+    """An immutable compiled taxonomy. Build a new one to change it."""
+
+    def __init__(self, rows: List[Tuple[str, str, List[str]]]):
+        self.lookup: Dict[str, Entry] = {}
+        self.trie: dict = {}
+        for name, category, synonyms in rows:
+            entry = (normalize_name(name), category)
+            for phrase in [name, *synonyms]:
+                key = normalize_name(phrase)
+                if key:
+                    self.lookup.setdefault(key, entry)
+        for key, entry in self.lookup.items():
+            node = self.trie
+            for word in key.split():
+                node = node.setdefault(word, {})
+            node[None] = entry
+        self._vocabulary = [key for key in self.lookup if len(key) >= FUZZY_MIN_LENGTH]
+        self._cache: Dict[str, Entry] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "Taxonomy":
+        rows = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                synonyms = [s for s in (row.get("synonyms") or "").split(";") if s.strip()]
+                rows.append((row["name"], row["category"] or MISC, synonyms))
+        if not rows:
+            raise ValueError(f"No taxonomy entries in {path}")
+        return cls(rows)
+
+    def _longest_phrase(self, words: List[str]) -> Optional[Entry]:
+        best, best_size = None, 0
+        for start in range(len(words)):
+            node = self.trie
+            for size, word in enumerate(words[start:], 1):
+                node = node.get(word)
+                if node is None:
+                    break
+                if None in node and size > best_size:
+                    best, best_size = node[None], size
+        return best
+
+    def _fuzzy(self, norm: str) -> Optional[Entry]:
+        if len(norm) < FUZZY_MIN_LENGTH:
+            return None
+        close = difflib.get_close_matches(
+            norm, self._vocabulary, n=1, cutoff=settings.TAXONOMY_FUZZY_CUTOFF
+        )
+        return self.lookup[close[0]] if close else None
+
+    def canonicalize(self, name: Optional[str]) -> Entry:
+        """(canonical name, category) for free-text `name`.
+
+        Known names and synonyms map to their canonical entry, and so do
+        near misses. Anything else keeps its normalized text and takes
+        the category of the longest known phrase in it, or Misc.
+        """
+        name = name or ""
+        cached = self._cache.get(name)  # raw text: hits skip normalization too
+        if cached is not None:
+            return cached
+        norm = normalize_name(name)
+        entry = self.lookup.get(norm) or self._fuzzy(norm)
+        if entry is None:
+            phrase = self._longest_phrase(norm.split())
+            entry = (norm, phrase[1] if phrase else MISC)
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[name] = entry
+        return entry
+
+
+class TaxonomyStore:
+    """Holds the current Taxonomy and swaps in a new one when the file changes."""
+
+    def __init__(self, path: str, reload_seconds: float):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._mtime = os.path.getmtime(path)
+        self._taxonomy = Taxonomy.load(path)
+        self._checked = time.monotonic()
+
+    def current(self) -> Taxonomy:
+        if self.reload_seconds >= 0 and time.monotonic() - self._checked >= self.reload_seconds:
+            self._maybe_reload()
+        return self._taxonomy
+
+    def _maybe_reload(self):
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime == self._mtime:
+                    return
+                taxonomy = Taxonomy.load(self.path)
+            except (OSError, KeyError, ValueError):
+                # A half-written or broken file keeps the last good taxonomy
+                logger.exception("Taxonomy reload failed; keeping the previous one")
+                return
+            self._taxonomy, self._mtime = taxonomy, mtime
+            logger.info("Reloaded taxonomy from %s (%d names)", self.path, len(taxonomy.lookup))
+
+    def reload(self) -> Taxonomy:
+        """Force a reload now (e.g. from a management command)."""
+        with self._lock:
+            self._mtime = os.path.getmtime(self.path)
+            self._taxonomy = Taxonomy.load(self.path)
+            self._checked = time.monotonic()
+        return self._taxonomy
+
+
+taxonomy_store = TaxonomyStore(settings.TAXONOMY_PATH, settings.TAXONOMY_RELOAD_SECONDS)
+
+
+def canonical_item(name: Optional[str]) -> Entry:
+    """(canonical name, category) for an item name from a request."""
+    return taxonomy_store.current().canonicalize(name)
+
+
+def renormalize_offers(db: Session, taxonomy: Optional[Taxonomy] = None) -> int:
+    """Rewrite stored item names and categories with the current taxonomy.
+
+    Works per distinct name rather than per row, so each spelling costs one
+    UPDATE. Returns the number of offer rows changed. Running servers keep
+    their match index until restart; stale entries only cause misses, since
+    every hit is re-checked against the row. Their cached offer responses
+    expire within RESPONSE_CACHE_TTL.
+    """
+    taxonomy = taxonomy or taxonomy_store.current()
+    changed = 0
+    for name_col, category_col in (
+        (Offer.have_name, Offer.have_category),
+        (Offer.want_name, Offer.want_category),
+    ):
+        pairs = db.execute(select(name_col, category_col).distinct()).all()
+        for name, category in pairs:
+            if name is None:
+                continue
+            new_name, new_category = taxonomy.canonicalize(name)
+            if (new_name, new_category) == (name, category):
+                continue
+            stmt = (
+                update(Offer)
+                .where(name_col == name)
+                .where(category_col.is_(None) if category is None else category_col == category)
+                .values({
+                    name_col.key: new_name, category_col.key: new_category,
+                    Offer.version.key: Offer.version + 1,
+                })
+                .execution_options(synchronize_session=False)
+            )
+            changed += db.execute(stmt).rowcount
+        db.commit()
+    response_cache.invalidate()
+    return changed
+
+
+if __name__ == "__main__":
+    from ai.backend.database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Re-normalized {renormalize_offers(db)} offer item fields")
+    finally:
+        db.close()
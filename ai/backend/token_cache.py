@@ -0,0 +1,110 @@
+"""Bounded LRU of verified access tokens → subject.
+
+Every authenticated request used to pay for a full `jwt.decode` with HMAC
+verification. A token that verified once stays valid until its `exp`, so we
+remember it until then. Revocation is checked on every lookup without
+touching the signing key: revoked tokens and "revoked before" marks per
+user live in plain dicts. Like the match index, this is per-process;
+logouts reach the other workers through the revoked_tokens table (see
+ai.backend.revocations).
+
+Tokens are held by `token_key` (a short digest), the same key the table
+stores, so a revocation read back from the database evicts the entry.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def token_key(token: str) -> str:
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+class TokenCache:
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # token_key -> (subject, exp, iat)
+        self._entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        # token_key -> exp; kept only until the token would have expired anyway
+        self._revoked: Dict[str, float] = {}
+        # subject -> tokens issued at or before this time are rejected
+        self._revoked_before: Dict[str, float] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[str]:
+        """Subject for a previously verified, unexpired token, else None."""
+        now = time.time() if now is None else now
+        key = token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            subject, exp, _ = entry
+            if exp <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return subject
+
+    def put(self, token: str, subject: str, exp: float, iat: float = 0.0):
+        if self.maxsize <= 0:
+            return
+        key = token_key(token)
+        with self._lock:
+            self._entries[key] = (subject, exp, iat)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    # --- Revocation (no signature work) ---
+    def is_revoked(self, token: str, subject: Optional[str] = None, iat: float = 0.0) -> bool:
+        with self._lock:
+            if token_key(token) in self._revoked:
+                return True
+            if subject is None:
+                return False
+            cutoff = self._revoked_before.get(subject)
+            return cutoff is not None and iat <= cutoff
+
+    def revoke(self, token: str, exp: float):
+        self.revoke_key(token_key(token), exp)
+
+    def revoke_key(self, key: str, exp: float):
+        """Revoke by `token_key` (revocations read back from the database)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._revoked[key] = exp
+            self._prune(time.time())
+
+    def revoke_subject(self, subject: str, before: Optional[float] = None):
+        """Reject every token issued to `subject` up to `before` (default: now)."""
+        before = time.time() if before is None else before
+        with self._lock:
+            self._revoked_before[subject] = before
+            for key in [k for k, e in self._entries.items() if e[0] == subject and e[2] <= before]:
+                del self._entries[key]
+
+    def _prune(self, now: float):
+        for key in [k for k, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "revoked": len(self._revoked),
+        }
@@ -0,0 +1,45 @@
+"""Per-request auth overhead: full jwt.decode vs the verified-token cache.
+
+Simulates `--users` clients each polling with their own access token.
+
+Usage: python -m ai.benchmarks.auth_bench --requests 100000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from jose import jwt
+
+from ai.backend.auth import ALGORITHM, SECRET_KEY, create_token, token_cache, verify_token
+
+
+def bench(label: str, fn, tokens, n: int):
+    picks = [random.choice(tokens) for _ in range(n)]
+    start = time.perf_counter()
+    for token in picks:
+        fn(token)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>14}: {elapsed / n * 1e6:7.2f} µs/request")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    args = parser.parse_args()
+
+    tokens = [create_token({"sub": f"user{i}"}, timedelta(minutes=15)) for i in range(args.users)]
+
+    uncached = bench(
+        "jwt.decode",
+        lambda t: jwt.decode(t, SECRET_KEY, algorithms=[ALGORITHM])["sub"],
+        tokens, args.requests,
+    )
+    cached = bench("token cache", verify_token, tokens, args.requests)
+    print(f"speedup: {uncached / cached:.1f}x  stats: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Chat fan-out latency with 1,000 simulated sockets in one room.
+
+Compares the old sequential `await send` loop with the per-connection
+broadcaster. Most fake sockets take `--fast-ms` per send, a few take
+`--slow-ms` (a phone on a bad network); we report the delay from publish to
+delivery for the healthy sockets.
+
+Usage: python -m ai.benchmarks.broadcast_bench --sockets 1000 --messages 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from ai.backend.broadcast import Broadcaster
+
+
+class FakeSocket:
+    def __init__(self, delay: float, latencies: list, record: bool):
+        self.delay = delay
+        self.latencies = latencies
+        self.record = record
+        self.sent_at = 0.0
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        if self.record:
+            self.latencies.append(time.perf_counter() - self.sent_at)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def make_sockets(args, latencies):
+    sockets = []
+    for i in range(args.sockets):
+        slow = i < args.slow
+        delay = (args.slow_ms if slow else args.fast_ms * random.uniform(0.5, 1.5)) / 1000
+        sockets.append(FakeSocket(delay, latencies, record=not slow))
+    return sockets
+
+
+async def sequential(args):
+    latencies: list = []
+    sockets = make_sockets(args, latencies)
+    for i in range(args.messages):
+        now = time.perf_counter()
+        for ws in sockets:
+            ws.sent_at = now
+        for ws in sockets:
+            await ws.send_text(f'{{"id": {i}}}')
+        await asyncio.sleep(args.interval_ms / 1000)
+    return latencies, 0
+
+
+async def broadcaster(args):
+    latencies: list = []
+    sockets = make_sockets(args, latencies)
+    b = Broadcaster(queue_size=args.queue_size, send_timeout=args.timeout)
+    conns = [b.connect("room", ws) for ws in sockets]
+    for i in range(args.messages):
+        now = time.perf_counter()
+        for ws in sockets:
+            ws.sent_at = now
+        b.publish("room", {"id": i})
+        await asyncio.sleep(args.interval_ms / 1000)
+    # Let queues drain
+    await asyncio.sleep(args.fast_ms * 2 / 1000 + 0.05)
+    dropped = len(conns) - b.count("room")
+    for conn in conns:
+        b.disconnect(conn)
+    return latencies, dropped
+
+
+def report(label, latencies, dropped, elapsed):
+    latencies.sort()
+    pct = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    print(f"{label:>11}: {len(latencies)} deliveries in {elapsed:.1f}s  "
+          f"p50 {pct(0.50):.1f}ms  p95 {pct(0.95):.1f}ms  p99 {pct(0.99):.1f}ms  "
+          f"max {latencies[-1] * 1000:.1f}ms  dropped {dropped}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=5, help="sockets with a slow network")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--fast-ms", type=float, default=1.0)
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    parser.add_argument("--interval-ms", type=float, default=50.0)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=0.25)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    runs = [("broadcaster", broadcaster)]
+    if not args.skip_sequential:
+        runs.insert(0, ("sequential", sequential))
+    for label, fn in runs:
+        start = time.perf_counter()
+        latencies, dropped = asyncio.run(fn(args))
+        report(label, latencies, dropped, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Offer import throughput: one create per row vs the batched bulk importer.
+
+Generates `--rows` offers from `--owners` owners over a handful of items and
+places, then imports them into a temp SQLite file twice: row by row the way
+POST /offers does it (session, matcher query, commit each), and through
+ai.backend.bulk.import_offers. Reports rows/sec and matches for each; trade
+cycles are left out of both so the matching work is the same.
+
+Usage: python -m ai.benchmarks.bulk_bench --rows 5000 --batch 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend import bulk
+from ai.backend.database import Base, apply_sqlite_pragmas
+from ai.backend.matching import find_reciprocal_match, match_index
+from ai.backend.models import Offer
+from ai.backend.offers import OfferCreate, build_offer
+
+ITEMS = ["rice", "yam", "beans", "garri", "maize", "plantain", "cassava", "palm oil",
+         "groundnut", "millet"]
+PLACES = ["Lagos", "Ikeja", "Ibadan", "Kano", "Abuja", "Enugu", "Nowhere"]
+
+
+def make_records(n: int, owners: int):
+    rng = random.Random(1)
+    for row in range(1, n + 1):
+        have, want = rng.sample(ITEMS, 2)
+        yield row, {
+            "owner": f"member{rng.randrange(owners)}",
+            "have_item": {"name": have, "quantity": f"{rng.randint(1, 5)} bags", "category": ""},
+            "want_item": {"name": want, "quantity": f"{rng.randint(1, 5)} bags", "category": ""},
+            "location": rng.choice(PLACES),
+        }
+
+
+async def fresh_database():
+    path = os.path.join(tempfile.mkdtemp(), "bulk.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    apply_sqlite_pragmas(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    match_index.__init__()  # start from an empty pool
+    return engine, sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def one_by_one(Session, records):
+    for _, record in records:
+        owner = record.pop("owner")
+        new_offer = build_offer(OfferCreate.model_validate(record), owner)
+        async with Session() as db:
+            db.add(new_offer)
+            match = await find_reciprocal_match(db, new_offer, owner)
+            if match:
+                new_offer.status = match.status = "matched"
+                new_offer.matched_with, match.matched_with = match.id, new_offer.id
+            await db.commit()
+        match_index.add(new_offer)
+        if match:
+            match_index.discard(match.id)
+
+
+async def batched(Session, records, batch: int):
+    bulk.AsyncSessionLocal = Session
+
+    async def source():
+        for item in records:
+            yield item
+
+    async for _ in bulk.import_offers(source(), "coop", batch, allow_row_owner=True):
+        pass
+
+
+async def count_matched(Session) -> int:
+    async with Session() as db:
+        return (await db.execute(
+            select(func.count()).select_from(Offer).where(Offer.status == "matched")
+        )).scalar()
+
+
+async def run(args):
+    for label in ("one by one", "bulk import"):
+        engine, Session = await fresh_database()
+        records = list(make_records(args.rows, args.owners))
+        start = time.perf_counter()
+        if label == "one by one":
+            await one_by_one(Session, records)
+        else:
+            await batched(Session, records, args.batch)
+        elapsed = time.perf_counter() - start
+        matched = await count_matched(Session)
+        await engine.dispose()
+        print(f"{label:>12}: {args.rows} rows in {elapsed:.2f}s = {args.rows / elapsed:,.0f} rows/s"
+              f"  ({matched} offers matched)")
+
+
+def main():
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--owners", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
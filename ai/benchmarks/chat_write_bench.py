@@ -0,0 +1,104 @@
+"""Chat insert throughput: one commit per message vs the group-commit writer.
+
+`--clients` concurrent senders each write `--messages` chat lines to a temp
+SQLite file, first the old way (add + commit + refresh on a session per
+client), then through ChatWriter. Reports messages/sec for each.
+
+Usage: python -m ai.benchmarks.chat_write_bench --clients 50 --messages 40
+       python -m ai.benchmarks.chat_write_bench --synchronous FULL
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend.chat_writer import ChatWriter
+from ai.backend.database import SQLITE_PRAGMAS, Base, apply_sqlite_pragmas
+from ai.backend.models import ChatMessage, Offer
+
+
+async def make_engine(path: str, synchronous: str, pool: int):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", pool_size=pool, max_overflow=0
+    )
+    apply_sqlite_pragmas(engine.sync_engine, {**SQLITE_PRAGMAS, "synchronous": synchronous})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Chat rows reference offers (foreign key): the rooms must exist
+        await conn.execute(Offer.__table__.insert(), [{"id": f"offer{i}"} for i in range(10)])
+    return engine
+
+
+async def per_message(engine, clients: int, messages: int):
+    Session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    failed = 0
+
+    async def client(i):
+        nonlocal failed
+        async with Session() as db:
+            for n in range(messages):
+                chat = ChatMessage(offer_id=f"offer{i % 10}", sender=f"user{i}",
+                                   content=f"hello {n}", timestamp=datetime.utcnow())
+                db.add(chat)
+                try:
+                    await db.commit()
+                    await db.refresh(chat)
+                except OperationalError:  # "database is locked" past busy_timeout
+                    await db.rollback()
+                    failed += 1
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return failed
+
+
+async def group_commit(engine, clients: int, messages: int, batch: int, delay_ms: float):
+    writer = ChatWriter(engine, max_batch=batch, max_delay=delay_ms / 1000)
+
+    async def client(i):
+        for n in range(messages):
+            await writer.write(f"offer{i % 10}", f"user{i}", f"hello {n}")
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    await writer.stop()
+    return writer
+
+
+async def run(args):
+    total = args.clients * args.messages
+    for label in ("per-message commit", "group commit"):
+        path = os.path.join(tempfile.mkdtemp(), "chat.db")
+        # per-message sessions each hold a pooled connection
+        engine = await make_engine(path, args.synchronous, pool=args.clients)
+        start = time.perf_counter()
+        failed = 0
+        if label == "group commit":
+            writer = await group_commit(engine, args.clients, args.messages,
+                                        args.batch, args.delay_ms)
+            extra = f"  ({writer.batches} batches, avg {writer.rows / writer.batches:.1f} rows)"
+        else:
+            failed = await per_message(engine, args.clients, args.messages)
+            extra = f"  ({failed} failed: database is locked)" if failed else ""
+        elapsed = time.perf_counter() - start
+        await engine.dispose()
+        done = total - failed
+        print(f"{label:>18}: {done} messages in {elapsed:.2f}s = {done / elapsed:,.0f} msg/s{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--synchronous", default=SQLITE_PRAGMAS["synchronous"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
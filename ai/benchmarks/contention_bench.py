@@ -0,0 +1,120 @@
+"""Read/write contention on SQLite: default rollback journal vs the tuned WAL pragmas.
+
+One writer thread inserts offers (one commit each) while N reader threads
+page through /offers-style queries. Reports reads/s, writes/s and how many
+operations failed with "database is locked".
+
+Usage: python -m ai.benchmarks.contention_bench --readers 8 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend.database import SQLITE_PRAGMAS, Base, apply_sqlite_pragmas
+from ai.backend.models import Offer
+from ai.backend.serializers import offer_columns
+
+MODES = {
+    "default (DELETE journal, FULL sync)": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "tuned (settings.SQLITE_*)": SQLITE_PRAGMAS,
+}
+
+
+def offer_row(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "have_name": "rice", "have_quantity": "2 bags", "have_category": "Grains",
+        "have_owner": f"user{i % 100}",
+        "want_name": "yam", "want_quantity": "10 tubers", "want_category": "Tubers",
+        "location": "Lagos", "status": "pending", "timestamp": datetime.utcnow(),
+    }
+
+
+def run_mode(path: str, pragmas: dict, readers: int, seconds: float, seed_rows: int):
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False},
+        pool_size=readers + 1,
+    )
+    apply_sqlite_pragmas(engine, pragmas)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.bulk_insert_mappings(Offer, [offer_row(i) for i in range(seed_rows)])
+        db.commit()
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        i = 0
+        with Session() as db:
+            while time.perf_counter() < deadline:
+                try:
+                    db.execute(Offer.__table__.insert().values(**offer_row(i)))
+                    db.commit()
+                    bump("writes")
+                except OperationalError:
+                    db.rollback()
+                    bump("locked")
+                i += 1
+
+    def reader(n):
+        stmt = select(*offer_columns()).where(Offer.have_owner == f"user{n}").order_by(
+            Offer.timestamp.desc(), Offer.id
+        ).limit(20)
+        with Session() as db:
+            while time.perf_counter() < deadline:
+                try:
+                    db.execute(stmt).all()
+                    db.commit()
+                    bump("reads")
+                except OperationalError:
+                    db.rollback()
+                    bump("locked")
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader, args=(n,)) for n in range(readers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--seed-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, pragmas in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            counts = run_mode(
+                os.path.join(tmp, "contention.db"), pragmas,
+                args.readers, args.seconds, args.seed_rows,
+            )
+        print(
+            f"{name:38s} reads/s={counts['reads'] / args.seconds:8.0f}"
+            f"  writes/s={counts['writes'] / args.seconds:6.0f}"
+            f"  locked={counts['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
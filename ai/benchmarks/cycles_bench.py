@@ -0,0 +1,73 @@
+"""Benchmark the trade-cycle search over a large pending-offer pool.
+
+Times the in-memory part of find_swap_cycle only: the item-path search
+(find_item_paths) and picking concrete offers (_pick_offers) on a
+MatchIndex of `--offers` offers over a `--items` vocabulary. The database
+re-check, declined-pair query and claim UPDATE are not included.
+
+Usage: python -m ai.benchmarks.cycles_bench --offers 1000000 --items 20000
+"""
+import argparse
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from ai.backend.cycles import _pick_offers, find_item_paths
+from ai.backend.matching import MatchIndex
+
+
+def build_index(n_offers: int, n_items: int, n_traders: int, rng: random.Random) -> MatchIndex:
+    index = MatchIndex()
+    items = [f"item{i}" for i in range(n_items)]
+    for i in range(n_offers):
+        have_name, want_name = rng.sample(items, 2)
+        index.add(SimpleNamespace(
+            id=f"o{i}",
+            status="pending",
+            have_name=have_name,
+            want_name=want_name,
+            have_owner=f"u{rng.randrange(n_traders)}",
+            lat=None,
+            lon=None,
+        ))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offers", type=int, default=1_000_000)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--traders", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    index = build_index(args.offers, args.items, args.traders, rng)
+    print(f"built index: {len(index)} pending offers in {time.perf_counter() - start:.1f}s")
+
+    timings = []
+    found = 0
+    for _ in range(args.queries):
+        have_name, want_name = rng.sample([f"item{i}" for i in range(args.items)], 2)
+        owner = f"u{rng.randrange(args.traders)}"
+        t0 = time.perf_counter()
+        for items in find_item_paths(index, want_name, have_name):
+            if _pick_offers(index, items, owner):
+                found += 1
+                break
+        timings.append(time.perf_counter() - t0)
+
+    timings.sort()
+    print(f"queries: {args.queries}, cycles found: {found}")
+    print(
+        f"in-memory search ms  p50={statistics.median(timings) * 1e3:.2f}"
+        f"  p99={timings[int(len(timings) * 0.99) - 1] * 1e3:.2f}"
+        f"  max={timings[-1] * 1e3:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Full offer export: /offers-style OFFSET paging vs the streaming export.
+
+Seeds `--offers` offers into a temp SQLite file, then reads every row back
+twice. The first pass pages the way a client walking GET /offers without
+cursors would: OFFSET/LIMIT, offer_row per row, and everything kept. The
+second goes through ai.backend.export.stream_rows: one server-side cursor,
+with NDJSON chunks discarded as they are produced. Reports time and peak
+traced memory for each.
+
+Usage: python -m ai.benchmarks.export_bench --offers 300000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend import export
+from ai.backend.database import Base, apply_sqlite_pragmas
+from ai.backend.models import Offer
+from ai.backend.serializers import OFFER_KEYS, offer_columns, offer_row
+
+
+def seed(path: str, n: int):
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_pragmas(engine)
+    Base.metadata.create_all(engine)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        for base in range(0, n, 10_000):
+            connection.execute(Offer.__table__.insert(), [
+                {
+                    "id": str(uuid.uuid4()), "have_name": "rice", "have_quantity": "2 bags",
+                    "have_category": "Grains", "have_owner": f"user{i % 5000}",
+                    "want_name": "yam", "want_quantity": "10 tubers", "want_category": "Tubers",
+                    "location": "Lagos", "message": "fresh from the farm, pick up any day",
+                    "status": ["pending", "matched", "completed"][i % 3],
+                    "timestamp": start + timedelta(seconds=i),
+                }
+                for i in range(base, min(base + 10_000, n))
+            ])
+    engine.dispose()
+
+
+async def offset_pages(Session, page_size: int) -> int:
+    offers = []
+    async with Session() as db:
+        page = 0
+        while True:
+            rows = (await db.execute(
+                select(*offer_columns()).order_by(Offer.timestamp, Offer.id)
+                .offset(page * page_size).limit(page_size)
+            )).all()
+            if not rows:
+                return len(offers)
+            offers.extend(offer_row(r) for r in rows)
+            page += 1
+
+
+async def streamed() -> int:
+    size = 0
+    async for chunk in export.stream_rows(export.offers_export_query(), OFFER_KEYS, "ndjson"):
+        size += len(chunk)
+    return size
+
+
+async def measure(label, make):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await make()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: {elapsed:7.2f}s  peak {peak / 2**20:7.1f} MiB  ({result:,})")
+
+
+async def run(path: str, page_size: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    apply_sqlite_pragmas(engine.sync_engine)
+    Session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    export.AsyncSessionLocal = Session
+
+    await measure(f"OFFSET pages of {page_size}", lambda: offset_pages(Session, page_size))
+    await measure("streaming export", streamed)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=300_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    path = os.path.join(tempfile.mkdtemp(), "export.db")
+    seed(path, args.offers)
+    asyncio.run(run(path, args.page_size))
+
+
+if __name__ == "__main__":
+    main()
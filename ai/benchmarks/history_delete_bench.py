@@ -0,0 +1,94 @@
+"""Clearing offer history: per-row ORM deletes vs one set-based DELETE.
+
+Seeds `--offers` completed offers for one owner, each with `--chats` chat
+messages, into a temp SQLite file. The first pass clears them the old way
+(load offers + chats, session.delete per offer); the second reseeds and
+runs the single DELETE ... RETURNING that /offers/history/clear now uses,
+with chat rows removed by ON DELETE CASCADE.
+
+Usage: python -m ai.benchmarks.history_delete_bench --offers 20000 --chats 5
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from ai.backend.counters import forget_offers, rebuild_counters
+from ai.backend.database import Base, apply_sqlite_pragmas
+from ai.backend.models import ChatMessage, Offer
+
+OWNER = "coop_lagos"
+
+
+def seed(Session, offers: int, chats: int):
+    now = datetime.utcnow()
+    ids = [str(uuid.uuid4()) for _ in range(offers)]
+    with Session() as db:
+        db.execute(Offer.__table__.insert(), [
+            {"id": i, "have_name": "rice", "want_name": "yam", "have_owner": OWNER,
+             "status": "completed", "timestamp": now}
+            for i in ids
+        ])
+        if chats:
+            db.execute(ChatMessage.__table__.insert(), [
+                {"offer_id": i, "sender": OWNER, "content": f"msg {n}", "timestamp": now}
+                for i in ids for n in range(chats)
+            ])
+        rebuild_counters(db)
+        db.commit()
+
+
+def per_row(Session) -> int:
+    with Session() as db:
+        offers = db.execute(
+            select(Offer).options(selectinload(Offer.chats))
+            .where(Offer.have_owner == OWNER, Offer.status == "completed")
+        ).scalars().all()
+        for offer in offers:
+            db.delete(offer)
+        db.commit()
+        return len(offers)
+
+
+def set_based(Session) -> int:
+    with Session() as db:
+        deleted = db.execute(
+            delete(Offer)
+            .where(Offer.have_owner == OWNER, Offer.status == "completed")
+            .returning(Offer.have_owner, Offer.status)
+            .execution_options(synchronize_session=False)
+        ).all()
+        forget_offers(db, deleted)
+        db.commit()
+        return len(deleted)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=20_000)
+    parser.add_argument("--chats", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'history.db')}")
+    apply_sqlite_pragmas(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+
+    for label, clear in (("per-row ORM delete", per_row), ("set-based DELETE", set_based)):
+        seed(Session, args.offers, args.chats)
+        start = time.perf_counter()
+        count = clear(Session)
+        elapsed = time.perf_counter() - start
+        with Session() as db:
+            left = db.scalar(select(func.count()).select_from(ChatMessage))
+        print(f"{label:>20}: {count:,} offers in {elapsed:6.2f}s  ({left} chat rows left)")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Concurrent request capacity of the offer API.
+
+Runs the app in-process over httpx's ASGI transport against a throw-away
+SQLite file and hammers authenticated read endpoints with N concurrent
+clients. Run it on two revisions to compare.
+
+Usage: python -m ai.benchmarks.load_bench --concurrency 200 --seconds 10
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend import database, main, settings
+from ai.backend.auth import create_token
+from ai.backend.database import Base
+from ai.backend.models import Offer
+
+ENDPOINTS = ["/offers/active", "/offers/my", "/offers/matches", "/offers/history"]
+
+
+def seed(url: str, n_offers: int, n_users: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.bulk_insert_mappings(Offer, [
+            {
+                "id": str(uuid.uuid4()),
+                "have_name": "rice", "have_quantity": "2 bags", "have_category": "Grains",
+                "have_owner": f"user{i % n_users}",
+                "want_name": "yam", "want_quantity": "10 tubers", "want_category": "Tubers",
+                "location": "Lagos", "status": ["pending", "matched", "completed"][i % 3],
+                "timestamp": datetime.utcnow(),
+            }
+            for i in range(n_offers)
+        ])
+        db.commit()
+    return engine
+
+
+def override_databases(path: str):
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.apply_sqlite_pragmas(sync_engine)
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    database.apply_sqlite_pragmas(async_engine.sync_engine)
+    AsyncSessionLocal = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
+
+    def get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    for dependency in {database.get_db, getattr(main, "get_db", None)} - {None}:
+        main.app.dependency_overrides[dependency] = get_db
+    main.app.dependency_overrides[database.get_async_db] = get_async_db
+    return sync_engine, async_engine
+
+
+NEW_OFFER = {
+    "have_item": {"name": "maize", "quantity": "1 bag", "category": "Grains"},
+    "want_item": {"name": "beans", "quantity": "1 bag", "category": "Legumes"},
+    "location": "Kano",
+}
+
+
+async def client_loop(client, headers, deadline, latencies, errors, write_every):
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        start = time.perf_counter()
+        if write_every and i % write_every == 0:
+            response = await client.post("/offers", json=NEW_OFFER, headers=headers)
+        else:
+            response = await client.get(ENDPOINTS[i % len(ENDPOINTS)], headers=headers)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def run(args, async_engine):
+    transport = httpx.ASGITransport(app=main.app)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tokens = [
+            {"Authorization": "Bearer " + create_token({"sub": f"user{u}"}, timedelta(hours=1))}
+            for u in range(args.users)
+        ]
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(*[
+            client_loop(client, tokens[c % args.users], deadline, latencies, errors, args.write_every)
+            for c in range(args.concurrency)
+        ])
+    await async_engine.dispose()
+    return latencies, errors
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--offers", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--write-every", type=int, default=10,
+                        help="every Nth request per client is POST /offers (0 = reads only)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # main.py turns on DEBUG logging
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "load.db")
+        seed(f"sqlite:///{path}", args.offers, args.users).dispose()
+        sync_engine, async_engine = override_databases(path)
+        latencies, errors = asyncio.run(run(args, async_engine))
+        sync_engine.dispose()
+
+    latencies.sort()
+    print(f"concurrency={args.concurrency} requests={len(latencies)} errors={len(errors)}")
+    print(f"throughput: {len(latencies) / args.seconds:.0f} req/s")
+    print(
+        f"latency ms  p50={statistics.median(latencies) * 1e3:.1f}"
+        f"  p99={latencies[int(len(latencies) * 0.99) - 1] * 1e3:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main_()
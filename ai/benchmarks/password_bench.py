@@ -0,0 +1,75 @@
+"""Login throughput of the Argon2 hashing pool: logins/sec overall and per core.
+
+Fires `--concurrency` verifies at a time through `PasswordHasher` for
+`--seconds` and reports throughput plus how many were shed with 503.
+Run once per executor kind / cost setting to compare.
+
+Usage: python -m ai.benchmarks.password_bench --kind thread --workers 4
+       AFROMARKET_ARGON2_MEMORY_COST_KIB=19456 python -m ai.benchmarks.password_bench
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from ai.backend import settings
+from ai.backend.passwords import PasswordHasher, hash_password
+
+
+async def run(hasher: PasswordHasher, hashed: str, concurrency: int, seconds: float):
+    latencies = []
+    ok = shed = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal ok, shed
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                assert await hasher.verify("correct horse", hashed)
+                ok += 1
+                latencies.append(time.perf_counter() - start)
+            except HTTPException:
+                shed += 1
+                await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return ok, shed, time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kind", choices=["thread", "process"], default=settings.PASSWORD_EXECUTOR)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    hashed = hash_password("correct horse")
+    hasher = PasswordHasher(args.workers, kind=args.kind, max_pending=args.max_pending)
+    try:
+        ok, shed, elapsed, latencies = asyncio.run(
+            run(hasher, hashed, args.concurrency, args.seconds)
+        )
+    finally:
+        hasher.shutdown()
+
+    cores = min(args.workers, os.cpu_count() or 1)
+    rate = ok / elapsed
+    print(f"argon2 t={settings.ARGON2_TIME_COST} m={settings.ARGON2_MEMORY_COST_KIB}KiB "
+          f"p={settings.ARGON2_PARALLELISM}, {args.kind} pool x{args.workers}")
+    print(f"  {ok} logins in {elapsed:.1f}s: {rate:.1f}/s, {rate / cores:.1f}/s per core")
+    print(f"  shed with 503: {shed}")
+    if latencies:
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"  latency p50 {statistics.median(latencies) * 1000:.0f}ms, p99 {p99 * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Cross-process chat fan-out through the SQLite pub/sub backend.
+
+Starts `--workers` processes, as uvicorn would, each with its own
+SQLitePubSub on one shared bus file. Every worker publishes `--messages`
+messages; each must receive every message from the others exactly once.
+Exits non-zero if any are lost or duplicated, then prints delivery latency.
+
+Usage: python -m ai.benchmarks.pubsub_bench --workers 4 --messages 200
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import orjson
+
+from ai.backend.pubsub import SQLitePubSub
+
+
+def worker(index, args, path, ready, go, results):
+    async def run():
+        received = Counter()
+        latencies = []
+
+        def handler(room_id, text):
+            msg = orjson.loads(text)
+            if msg["worker"] != index:
+                received[(msg["worker"], msg["n"])] += 1
+                latencies.append(time.time() - msg["sent"])
+
+        bus = SQLitePubSub(handler, path, poll_interval=args.poll_ms / 1000)
+        await bus.start()
+        ready.release()
+        while not go.is_set():
+            await asyncio.sleep(0.01)
+        for n in range(args.messages):
+            await bus.publish("offer-1", {"worker": index, "n": n, "sent": time.time()})
+            await asyncio.sleep(args.interval_ms / 1000)
+
+        expected = (args.workers - 1) * args.messages
+        deadline = time.time() + args.timeout
+        while sum(received.values()) < expected and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(args.poll_ms * 3 / 1000)  # catch duplicates
+        await bus.stop()
+        missing = expected - len(received)
+        duplicated = sum(c - 1 for c in received.values() if c > 1)
+        results.put((index, missing, duplicated, latencies))
+
+    try:
+        asyncio.run(run())
+    except Exception as exc:
+        # Report instead of dying silently, or the parent waits for nothing
+        print(f"worker {index} failed: {exc!r}", file=sys.stderr)
+        results.put((index, -1, 0, []))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=2.0)
+    parser.add_argument("--poll-ms", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "chat_bus.db")
+    ready, go, results = mp.Semaphore(0), mp.Event(), mp.Queue()
+    procs = [
+        mp.Process(target=worker, args=(i, args, path, ready, go, results))
+        for i in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.acquire()
+    go.set()
+
+    ok = True
+    latencies = []
+    for _ in procs:
+        index, missing, duplicated, lat = results.get(timeout=args.timeout + 30)
+        latencies += lat
+        print(f"worker {index}: received {len(lat)}, missing {missing}, duplicated {duplicated}")
+        ok = ok and missing == 0 and not duplicated
+    for p in procs:
+        p.join()
+
+    latencies.sort()
+    if latencies:
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"delivery latency p50 {statistics.median(latencies) * 1000:.1f}ms "
+              f"p99 {p99 * 1000:.1f}ms")
+    print("OK: every message reached every other worker" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
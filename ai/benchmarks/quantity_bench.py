@@ -0,0 +1,83 @@
+"""Quantity parsing: known-answer check, then parse throughput.
+
+First runs parse_quantity over EXPECTED, strings users actually type
+(ranges, decimal commas, glued units, words that contain a one-letter
+unit, input that must be rejected), and exits non-zero on any wrong
+answer. Then times `--texts`
+parses of a random mix of them.
+
+Usage: python -m ai.benchmarks.quantity_bench --texts 200000
+"""
+import argparse
+import random
+import sys
+import time
+
+from ai.backend.quantity import parse_quantity
+
+EXPECTED = {
+    "2 bags": (2.0, "bag"),
+    "500g": (0.5, "kg"),
+    "half basket": (0.5, "basket"),
+    "half a bag": (0.5, "bag"),
+    "a 50kg bag": (50.0, "kg"),
+    "2 x 50kg": (100.0, "kg"),
+    "2 by 3 crates": (6.0, "crate"),
+    "3 big bags": (3.0, "bag"),
+    "1,000 kg": (1000.0, "kg"),
+    "a dozen": (12.0, "piece"),
+    "5 l": (5.0, "l"),
+    "2t": (2000.0, "kg"),
+    "3": (3.0, "piece"),
+    # Ranges keep the lower bound (were multiplied: 200 kg, 200 bags)
+    "10-20 kg": (10.0, "kg"),
+    "10 to 20 bags": (10.0, "bag"),
+    # Decimal comma (was read as a thousands separator: 15 kg)
+    "1,5 kg": (1.5, "kg"),
+    "2,25 l": (2.25, "l"),
+    # One-letter units only right after a number (was 1000 kg / 1 l / 1 kg)
+    "don't know": (None, None),
+    "call me": (None, None),
+    "big g": (None, None),
+    # Two numbers, no operator: ambiguous, left unparsed
+    "2 50kg bags": (None, None),
+    # Rejected rather than guessed (were 5 kg, 1 kg, 100 pieces)
+    "five hundred kg": (None, None),
+    "twenty bags": (None, None),
+    "1/0 kg": (None, None),
+    "100 naira": (None, None),
+    "5 yams": (None, None),
+    "3 big bags": (3.0, "bag"),
+    "1/2 bag": (0.5, "bag"),
+}
+
+
+def check() -> bool:
+    ok = True
+    for text, expected in EXPECTED.items():
+        got = parse_quantity(text)
+        if got != expected:
+            print(f"WRONG {text!r}: got {got}, expected {expected}")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=200_000)
+    args = parser.parse_args()
+
+    if not check():
+        sys.exit(1)
+    print(f"{len(EXPECTED)} known answers OK")
+
+    texts = random.Random(7).choices(list(EXPECTED), k=args.texts)
+    start = time.perf_counter()
+    for text in texts:
+        parse_quantity(text)
+    elapsed = time.perf_counter() - start
+    print(f"parse_quantity: {elapsed / len(texts) * 1e6:.2f} µs/text")
+
+
+if __name__ == "__main__":
+    main()
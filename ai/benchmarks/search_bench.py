@@ -0,0 +1,131 @@
+"""Offer search at scale: FTS5 (/offers/search) vs a LIKE scan.
+
+Seeds `--offers` offers (default 1M) into a temp SQLite file with the FTS
+triggers installed, then times search_offers() for a few query shapes
+(common word, rare word, prefix, two words, deep page via cursor) against
+the LIKE '%term%' filter clients would otherwise need.
+
+Usage: python -m ai.benchmarks.search_bench --offers 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend.database import Base, apply_sqlite_pragmas
+from ai.backend.models import Offer
+from ai.backend.search import install_search, search_offers
+from ai.backend.serializers import offer_columns
+
+ITEMS = ["rice", "yam", "beans", "garri", "maize", "plantain", "cassava", "palm oil",
+         "groundnut", "millet", "sorghum", "cocoyam", "tomatoes", "pepper", "onions",
+         "egusi", "ogbono", "okra", "ugu", "catfish", "goat", "chicken", "eggs", "honey"]
+PLACES = ["Lagos", "Ibadan", "Abuja", "Kano", "Enugu", "Aba", "Jos", "Ilorin", "Benin",
+          "Owerri", "Calabar", "Warri", "Makurdi", "Sokoto", "Yola"]
+WORDS = ["fresh", "dried", "bulk", "organic", "local", "premium", "new", "harvest",
+         "bag", "basket", "quick", "swap", "today", "weekend", "market", "farm"]
+RARE = "shea"  # appears in ~1 in 10,000 offers
+
+
+def seed(path: str, n: int):
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_pragmas(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        install_search(connection)
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    batch = []
+    t0 = time.perf_counter()
+    with engine.begin() as connection:
+        for i in range(n):
+            have, want = rng.sample(ITEMS, 2)
+            if rng.random() < 0.0001:
+                have = f"{RARE} butter"
+            batch.append({
+                "id": str(uuid.uuid4()), "have_name": have, "want_name": want,
+                "have_owner": f"user{rng.randrange(50_000)}", "location": rng.choice(PLACES),
+                "message": " ".join(rng.sample(WORDS, 4)),
+                "status": rng.choice(["pending", "pending", "matched", "completed"]),
+                "timestamp": start + timedelta(seconds=i),
+            })
+            if len(batch) == 10_000:
+                connection.execute(Offer.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Offer.__table__.insert(), batch)
+    engine.dispose()
+    return time.perf_counter() - t0
+
+
+async def run(path: str, repeat: int, like_repeat: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    apply_sqlite_pragmas(engine.sync_engine)
+    Session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with Session() as db:
+        async def fts(q, cursor=None, status=None):
+            return await search_offers(db, q, status=status, limit=20, cursor=cursor)
+
+        async def like(term):
+            pattern = f"%{term}%"
+            stmt = select(*offer_columns()).where(or_(
+                Offer.have_name.like(pattern), Offer.want_name.like(pattern),
+                Offer.location.like(pattern), Offer.message.like(pattern),
+            )).limit(20)
+            return (await db.execute(stmt)).all()
+
+        async def measure(label, make, n):
+            samples = []
+            rows = None
+            for _ in range(n):
+                start = time.perf_counter()
+                rows = await make()
+                samples.append(time.perf_counter() - start)
+            print(f"  {label:<36} p50 {statistics.median(samples) * 1000:8.2f}ms")
+            return rows
+
+        print("FTS5 /offers/search (20 per page, ranked):")
+        await measure("common word  'rice'", lambda: fts("rice"), repeat)
+        await measure("rare word    'shea'", lambda: fts(RARE), repeat)
+        await measure("prefix       'plan'", lambda: fts("plan"), repeat)
+        await measure("two words    'yam ibadan'", lambda: fts("yam ibadan"), repeat)
+        await measure("pending only 'yam ibadan'", lambda: fts("yam ibadan", status="pending"), repeat)
+        rows, cursor = await fts("yam ibadan")
+        for _ in range(10):
+            rows, cursor = await fts("yam ibadan", cursor=cursor)
+        await measure("page 12 via cursor 'yam ibadan'", lambda: fts("yam ibadan", cursor=cursor), repeat)
+
+        print("LIKE '%term%' scan (first 20, unranked):")
+        await measure("common word  'rice'", lambda: like("rice"), like_repeat)
+        await measure("rare word    'shea'", lambda: like(RARE), like_repeat)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--like-repeat", type=int, default=3)
+    parser.add_argument("--db", help="reuse a database seeded by an earlier run")
+    args = parser.parse_args()
+
+    path = args.db
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "search.db")
+        elapsed = seed(path, args.offers)
+        print(f"Seeded {args.offers:,} offers (with FTS triggers) in {elapsed:.1f}s at {path}")
+    asyncio.run(run(path, args.repeat, args.like_repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Serialization cost per 1,000 offers: ORM + to_dict + json vs column rows + orjson.
+
+Usage: python -m ai.benchmarks.serialize_bench
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ai.backend.database import Base
+from ai.backend.models import Offer
+from ai.backend.serializers import offer_columns, offer_row
+
+
+def legacy_badge(status: str) -> str:
+    if status == "pending":
+        return "🟢 Pending"
+    elif status == "matched":
+        return "🟡 Matched"
+    elif status in ["completed", "declined"]:
+        return "🔴 " + status.capitalize()
+    else:
+        return status
+
+
+def legacy_to_dict(obj):
+    data = obj.__dict__.copy()
+    data.pop("_sa_instance_state", None)
+    return data
+
+
+def seed(db, n: int):
+    statuses = ["pending", "matched", "completed", "declined"]
+    db.bulk_insert_mappings(Offer, [
+        {
+            "id": str(uuid.uuid4()),
+            "have_name": "rice", "have_quantity": "2 bags", "have_category": "Grains",
+            "have_owner": f"user{i % 50}",
+            "want_name": "yam", "want_quantity": "10 tubers", "want_category": "Tubers",
+            "location": "Lagos", "message": "Fresh from the farm",
+            "status": statuses[i % 4], "timestamp": datetime.utcnow(),
+        }
+        for i in range(n)
+    ])
+    db.commit()
+
+
+def timed(fn, rounds: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offers", type=int, default=1_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        seed(db, args.offers)
+
+    def before():
+        with Session() as db:
+            offers = db.query(Offer).limit(args.offers).all()
+            payload = [{**legacy_to_dict(o), "badge": legacy_badge(o.status)} for o in offers]
+            json.dumps(jsonable_encoder({"offers": payload}), ensure_ascii=False).encode()
+
+    def after():
+        with Session() as db:
+            rows = db.query(*offer_columns()).limit(args.offers).all()
+            ORJSONResponse({"offers": [offer_row(r) for r in rows]})
+
+    old = timed(before, args.rounds)
+    new = timed(after, args.rounds)
+    per = 1_000 / args.offers
+    print(f"offers per response: {args.offers}")
+    print(f"before (ORM + to_dict + json):   {old * per * 1e3:.2f} ms / 1k offers")
+    print(f"after  (rows + lookup + orjson): {new * per * 1e3:.2f} ms / 1k offers")
+    print(f"speed-up: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
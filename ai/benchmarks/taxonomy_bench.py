@@ -0,0 +1,71 @@
+"""Item name normalization: inline if/elif lists vs the compiled taxonomy.
+
+Times the old per-request `categorize_item` (lists rebuilt and scanned on
+every call) against Taxonomy.canonicalize on a mix of known names, synonyms,
+misspellings and unknown items, and reports how many spellings each maps to
+the same canonical item.
+
+Usage: python -m ai.benchmarks.taxonomy_bench --names 100000
+"""
+import argparse
+import random
+import time
+
+from ai.backend.taxonomy import Taxonomy, taxonomy_store
+
+SAMPLES = ["Cassava", "casava", "manioc", "cassava ", "gari", "Garri", "yams", "Yam",
+           "palm oil", "Red Oil", "fresh palm oil", "tomatos", "Tomatoes", "corn",
+           "Maize", "groundnuts", "peanut", "onions", "Beans", "honey beans", "widget",
+           "rice", "Ofada rice", "plantains", "egg", "crate of eggs", "Goat", "ram"]
+
+
+def categorize_item(name: str) -> str:
+    # The inline helper create_offer used to define on every request
+    name = name.lower()
+    if name in ["rice", "maize", "millet", "sorghum"]:
+        return "Grains"
+    elif name in ["yam", "cassava", "cocoyam", "sweet potato"]:
+        return "Tubers"
+    elif name in ["palm oil", "groundnut oil", "vegetable oil"]:
+        return "Oils"
+    elif name in ["beans", "lentils", "soybeans"]:
+        return "Legumes"
+    elif name in ["onion", "garlic", "ginger"]:
+        return "Spices"
+    else:
+        return "Misc"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=100_000)
+    args = parser.parse_args()
+    rng = random.Random(3)
+    names = [rng.choice(SAMPLES) for _ in range(args.names)]
+
+    start = time.perf_counter()
+    old = [(n.lower(), categorize_item(n)) for n in names]
+    old_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    taxonomy = Taxonomy.load(taxonomy_store.path)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [taxonomy.canonicalize(n) for n in names]
+    new_s = time.perf_counter() - start
+
+    cold = Taxonomy.load(taxonomy_store.path)
+    start = time.perf_counter()
+    for n in SAMPLES:
+        cold.canonicalize(n)
+    cold_us = (time.perf_counter() - start) / len(SAMPLES) * 1e6
+
+    print(f"taxonomy compiled in {build_s * 1000:.1f}ms ({len(taxonomy.lookup)} names)")
+    print(f"inline lists: {old_s / args.names * 1e6:6.2f}us/name, "
+          f"{len(set(old))} distinct items, {sum(c == 'Misc' for _, c in set(old))} Misc")
+    print(f"taxonomy:     {new_s / args.names * 1e6:6.2f}us/name (first sight {cold_us:.0f}us), "
+          f"{len(set(new))} distinct items, {sum(c == 'Misc' for _, c in set(new))} Misc")
+
+
+if __name__ == "__main__":
+    main()
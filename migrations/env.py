@@ -3,7 +3,7 @@ import sys
 import os
 
 from ai.backend.database import Base
-from ai.backend import models
+from ai.backend import models, settings
 
 from sqlalchemy import engine_from_config, pool
 from alembic import context
@@ -14,6 +14,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ai'))
 # --- Alembic Config object ---
 config = context.config
 
+# 👇 Same URL as the app (AFROMARKET_DATABASE_URL / .env), not the ini default
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
 # Interpret the config file for Python logging.
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
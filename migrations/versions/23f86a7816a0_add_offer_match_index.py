@@ -0,0 +1,31 @@
+"""add offer match index
+
+Revision ID: 23f86a7816a0
+Revises: 55b74fb0edea
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "23f86a7816a0"
+down_revision = "55b74fb0edea"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_offers_match",
+        "offers",
+        ["have_name", "want_name", "status"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offers_match", table_name="offers", if_exists=True)
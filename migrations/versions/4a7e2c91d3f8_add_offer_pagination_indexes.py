@@ -0,0 +1,40 @@
+"""add offer pagination indexes
+
+Revision ID: 4a7e2c91d3f8
+Revises: 9c41d0e7b2a5
+Create Date: 2026-10-18 11:24:05.903117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4a7e2c91d3f8"
+down_revision = "9c41d0e7b2a5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_offers_timestamp_id", "offers", ["timestamp", "id"], if_not_exists=True)
+    op.create_index(
+        "ix_offers_owner_timestamp_id",
+        "offers",
+        ["have_owner", "timestamp", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_offers_owner_status_timestamp_id",
+        "offers",
+        ["have_owner", "status", "timestamp", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offers_owner_status_timestamp_id", table_name="offers", if_exists=True)
+    op.drop_index("ix_offers_owner_timestamp_id", table_name="offers", if_exists=True)
+    op.drop_index("ix_offers_timestamp_id", table_name="offers", if_exists=True)
@@ -0,0 +1,29 @@
+"""add offer cycle_id
+
+Revision ID: 9c41d0e7b2a5
+Revises: 23f86a7816a0
+Create Date: 2026-10-18 10:03:17.552914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9c41d0e7b2a5"
+down_revision = "23f86a7816a0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("offers", sa.Column("cycle_id", sa.String(), nullable=True))
+    op.create_index("ix_offers_cycle_id", "offers", ["cycle_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offers_cycle_id", table_name="offers")
+    with op.batch_alter_table("offers") as batch_op:
+        batch_op.drop_column("cycle_id")
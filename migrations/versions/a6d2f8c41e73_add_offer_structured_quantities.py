@@ -0,0 +1,215 @@
+"""add parsed offer quantities (amount + canonical unit)
+
+Revision ID: a6d2f8c41e73
+Revises: f3c7a9e25b18
+Create Date: 2026-10-18 20:12:05.917342
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a6d2f8c41e73"
+down_revision = "f3c7a9e25b18"
+branch_labels = None
+depends_on = None
+
+# --- Frozen copy of the quantity parser and data/units.csv (alias,unit,factor) ---
+_UNITS_CSV = """
+kg,kg,1
+kgs,kg,1
+kilo,kg,1
+kilos,kg,1
+kilogram,kg,1
+kilograms,kg,1
+g,kg,0.001
+gram,kg,0.001
+grams,kg,0.001
+t,kg,1000
+ton,kg,1000
+tons,kg,1000
+tonne,kg,1000
+tonnes,kg,1000
+lb,kg,0.4536
+lbs,kg,0.4536
+pound,kg,0.4536
+pounds,kg,0.4536
+l,l,1
+ltr,l,1
+ltrs,l,1
+litre,l,1
+litres,l,1
+liter,l,1
+liters,l,1
+ml,l,0.001
+cl,l,0.01
+gallon,l,4.546
+gallons,l,4.546
+bag,bag,1
+bags,bag,1
+sack,bag,1
+sacks,bag,1
+tuber,tuber,1
+tubers,tuber,1
+crate,crate,1
+crates,crate,1
+basket,basket,1
+baskets,basket,1
+bunch,bunch,1
+bunches,bunch,1
+carton,carton,1
+cartons,carton,1
+keg,keg,1
+kegs,keg,1
+jerrycan,keg,1
+jerrycans,keg,1
+mudu,mudu,1
+mudus,mudu,1
+tin,mudu,1
+tins,mudu,1
+paint,paint,1
+paints,paint,1
+bucket,paint,1
+buckets,paint,1
+piece,piece,1
+pieces,piece,1
+pcs,piece,1
+pc,piece,1
+head,piece,1
+heads,piece,1
+dozen,piece,12
+dozens,piece,12
+"""
+_UNITS = {
+    alias: (unit, float(factor))
+    for alias, unit, factor in (line.split(",") for line in _UNITS_CSV.strip().splitlines())
+}
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "half": 0.5, "quarter": 0.25,
+}
+# 👇 Number words we do not compose ("five hundred"): the text is rejected, not guessed
+_UNSUPPORTED_NUMBER_WORDS = {
+    "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+    "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety",
+    "hundred", "hundreds", "thousand", "thousands", "million", "millions", "billion",
+}
+
+_TOKEN = re.compile(
+    r"(?P<num>\d{1,3}(?:,\d{3})+(?![\d,])"   # thousands: 1,000  12,500
+    r"|\d+,\d{1,2}(?!\d)"                     # decimal comma: 1,5  2,25
+    r"|\d+(?:\.\d+)?(?:/\d+)?)"                # 2  2.5  1/2
+    r"|(?P<word>[a-z]+)|(?P<dash>-)"
+)
+_TIMES = {"x", "by"}
+_RANGE = {"to"}
+_ARTICLES = {"a", "an"}
+
+
+def _number(token):
+    if token[0].isdigit():
+        if "/" in token:
+            num, den = token.split("/")
+            return float(num) / float(den) if float(den) else None  # 1/0 is unreadable
+        if re.fullmatch(r"\d+,\d{1,2}", token):
+            return float(token.replace(",", "."))
+        return float(token.replace(",", ""))
+    return _NUMBER_WORDS.get(token)
+
+
+def _parse_quantity(text):
+    """Frozen copy of ai.backend.quantity.parse_quantity as of this revision."""
+    if not text:
+        return None, None
+    text = text.lower()
+    value = None
+    weak = False  # value came from "a"/"an": a following number replaces it
+    unknown = False  # a non-unit word followed the amount ("100 naira")
+    last, last_end = None, 0  # kind of the previous token ("num", "times", "range", "word")
+    for match in _TOKEN.finditer(text):
+        token = match.group()
+        after_number = last == "num" and not text[last_end:match.start()].strip(" -")
+        last_end = match.end()
+        if match.group("dash") or token in _RANGE:
+            if last == "num":
+                last = "range"
+            continue
+        if token in _TIMES:
+            if value is not None:
+                last = "times"
+            continue
+        unit = _UNITS.get(token)
+        if unit is not None and (len(token) > 1 or after_number):
+            amount = (1.0 if value is None else value) * unit[1]
+            return (amount, unit[0]) if amount > 0 else (None, None)
+        if token in _ARTICLES and value is not None:
+            continue  # "half a bag"
+        if token in _UNSUPPORTED_NUMBER_WORDS:
+            return None, None
+        number = _number(token)
+        if number is None:
+            if match.group("num"):
+                return None, None  # "1/0"
+            # other words ("3 big bags", "bags of") are skipped, but need a unit later
+            if value is not None and not weak:
+                unknown = True
+            if last != "range":
+                last = "word"
+            continue
+        if last == "range":
+            pass  # upper bound of "10-20": keep the lower one
+        elif value is None or weak:
+            value = number
+        elif last == "times":
+            value *= number
+        else:
+            return None, None  # "2 50kg bags": which number is the amount?
+        weak = token in _ARTICLES
+        last = "num"
+    if value is not None and value > 0 and not unknown:
+        return value, "piece"
+    return None, None
+
+
+def upgrade() -> None:
+    op.add_column("offers", sa.Column("have_qty", sa.Float(), nullable=True))
+    op.add_column("offers", sa.Column("have_unit", sa.String(), nullable=True))
+    op.add_column("offers", sa.Column("want_qty", sa.Float(), nullable=True))
+    op.add_column("offers", sa.Column("want_unit", sa.String(), nullable=True))
+    op.create_index(
+        "ix_offers_have_qty", "offers", ["have_name", "have_unit", "have_qty"], if_not_exists=True
+    )
+
+    # Backfill with the parser as it was when this revision was written
+    # (frozen above, not ai.backend.quantity): parse each distinct text once
+    bind = op.get_bind()
+    for side in ("have", "want"):
+        texts = bind.execute(
+            sa.text(f"SELECT DISTINCT {side}_quantity FROM offers WHERE {side}_quantity IS NOT NULL")
+        ).scalars().all()
+        for text in texts:
+            value, unit = _parse_quantity(text)
+            if value is None:
+                continue
+            bind.execute(
+                sa.text(
+                    f"UPDATE offers SET {side}_qty = :value, {side}_unit = :unit"
+                    f" WHERE {side}_quantity = :text"
+                ),
+                {"value": value, "unit": unit, "text": text},
+            )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offers_have_qty", table_name="offers", if_exists=True)
+    with op.batch_alter_table("offers") as batch_op:
+        batch_op.drop_column("want_unit")
+        batch_op.drop_column("want_qty")
+        batch_op.drop_column("have_unit")
+        batch_op.drop_column("have_qty")
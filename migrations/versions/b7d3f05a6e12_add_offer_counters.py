@@ -0,0 +1,40 @@
+"""add offer counters
+
+Revision ID: b7d3f05a6e12
+Revises: 4a7e2c91d3f8
+Create Date: 2026-10-18 12:40:51.271830
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7d3f05a6e12"
+down_revision = "4a7e2c91d3f8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "offer_counters",
+        sa.Column("have_owner", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        INSERT INTO offer_counters (have_owner, status, count)
+        SELECT have_owner, COALESCE(status, 'pending'), COUNT(*)
+        FROM offers
+        WHERE have_owner IS NOT NULL
+        GROUP BY have_owner, COALESCE(status, 'pending')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("offer_counters")
@@ -0,0 +1,52 @@
+"""declined_pairs table, exploded from offers.declined_with
+
+Revision ID: b8e1c5d93a27
+Revises: a6d2f8c41e73
+Create Date: 2026-10-18 21:03:44.208615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b8e1c5d93a27"
+down_revision = "a6d2f8c41e73"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases built only from migrations never got the column (create_all added it)
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("offers")}
+    if "declined_with" not in columns:
+        op.add_column("offers", sa.Column("declined_with", sa.Text(), server_default="[]"))
+
+    op.create_table(
+        "declined_pairs",
+        sa.Column("offer_id", sa.String(), sa.ForeignKey("offers.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("other_id", sa.String(), sa.ForeignKey("offers.id", ondelete="CASCADE"), primary_key=True),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_declined_pairs_other_id", "declined_pairs", ["other_id"], if_not_exists=True
+    )
+    # One row per direction; ids of offers deleted since are dropped
+    for first, second in (("o.id", "j.value"), ("j.value", "o.id")):
+        op.execute(
+            f"""
+            INSERT OR IGNORE INTO declined_pairs (offer_id, other_id)
+            SELECT {first}, {second}
+            FROM offers AS o, json_each(o.declined_with) AS j
+            WHERE json_valid(o.declined_with)
+              AND json_type(o.declined_with) = 'array'
+              AND j.value IN (SELECT id FROM offers)
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_declined_pairs_other_id", table_name="declined_pairs", if_exists=True)
+    op.drop_table("declined_pairs")
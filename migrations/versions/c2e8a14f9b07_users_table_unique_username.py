@@ -0,0 +1,46 @@
+"""users table with unique username index
+
+Revision ID: c2e8a14f9b07
+Revises: b7d3f05a6e12
+Create Date: 2026-10-18 14:02:33.480516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c2e8a14f9b07"
+down_revision = "b7d3f05a6e12"
+branch_labels = None
+depends_on = None
+
+
+# 👇 Named primary key: marks a users table this revision created itself
+# (create_all leaves it unnamed), so downgrade() knows to drop it
+CREATED_PK = "pk_users_c2e8a14f9b07"
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("username", sa.String()),
+            sa.Column("password", sa.String()),
+            sa.PrimaryKeyConstraint("username", name=CREATED_PK),
+        )
+    # create_all used to leave a plain (non-unique) index behind
+    op.drop_index("ix_users_username", table_name="users", if_exists=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_username", table_name="users")
+    if sa.inspect(op.get_bind()).get_pk_constraint("users").get("name") == CREATED_PK:
+        op.drop_table("users")
+        return
+    # The table predates this revision (create_all): keep it and its accounts
+    op.create_index("ix_users_username", "users", ["username"])
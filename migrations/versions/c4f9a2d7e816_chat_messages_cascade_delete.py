@@ -0,0 +1,50 @@
+"""chat_messages.offer_id: ON DELETE CASCADE
+
+Revision ID: c4f9a2d7e816
+Revises: b8e1c5d93a27
+Create Date: 2026-10-18 23:12:05.417392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c4f9a2d7e816"
+down_revision = "b8e1c5d93a27"
+branch_labels = None
+depends_on = None
+
+FK_NAME = "fk_chat_messages_offer_id_offers"
+
+# 👇 The original FK has no name: the convention gives the reflected one this name
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _set_ondelete(ondelete) -> None:
+    # SQLite cannot alter a constraint: batch mode rebuilds the table (indexes included)
+    with op.batch_alter_table(
+        "chat_messages", naming_convention=NAMING, recreate="always"
+    ) as batch_op:
+        batch_op.drop_constraint(FK_NAME, type_="foreignkey")
+        batch_op.create_foreign_key(FK_NAME, "offers", ["offer_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    # Chat left behind by offers deleted before foreign keys were enforced
+    op.execute(
+        "DELETE FROM chat_messages WHERE offer_id IS NOT NULL"
+        " AND offer_id NOT IN (SELECT id FROM offers)"
+    )
+    if sa.inspect(op.get_bind()).has_table("declined_pairs"):
+        op.execute(
+            "DELETE FROM declined_pairs WHERE offer_id NOT IN (SELECT id FROM offers)"
+            " OR other_id NOT IN (SELECT id FROM offers)"
+        )
+    _set_ondelete("CASCADE")
+
+
+def downgrade() -> None:
+    _set_ondelete(None)
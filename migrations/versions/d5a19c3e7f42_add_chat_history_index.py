@@ -0,0 +1,46 @@
+"""add chat history cursor index
+
+Revision ID: d5a19c3e7f42
+Revises: c2e8a14f9b07
+Create Date: 2026-10-18 16:10:42.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d5a19c3e7f42"
+down_revision = "c2e8a14f9b07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("chat_messages"):
+        # Until now only init_db()'s create_all made this table
+        op.create_table(
+            "chat_messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("offer_id", sa.String(), sa.ForeignKey("offers.id")),
+            sa.Column("sender", sa.String(), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("timestamp", sa.DateTime()),
+        )
+        op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+        op.create_index("ix_chat_messages_offer_id", "chat_messages", ["offer_id"])
+    op.create_index(
+        "ix_chat_messages_offer_timestamp_id",
+        "chat_messages",
+        ["offer_id", "timestamp", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_chat_messages_offer_timestamp_id", table_name="chat_messages", if_exists=True
+    )
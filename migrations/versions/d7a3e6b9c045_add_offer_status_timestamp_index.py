@@ -0,0 +1,28 @@
+"""add offer (status, timestamp) index for expiry
+
+Revision ID: d7a3e6b9c045
+Revises: c4f9a2d7e816
+Create Date: 2026-10-18 23:48:31.602719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d7a3e6b9c045"
+down_revision = "c4f9a2d7e816"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_offers_status_timestamp", "offers", ["status", "timestamp"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offers_status_timestamp", table_name="offers", if_exists=True)
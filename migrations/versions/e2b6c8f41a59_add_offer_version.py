@@ -0,0 +1,29 @@
+"""add offers.version for ETags
+
+Revision ID: e2b6c8f41a59
+Revises: d7a3e6b9c045
+Create Date: 2026-10-19 00:21:47.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e2b6c8f41a59"
+down_revision = "d7a3e6b9c045"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "offers", sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("offers") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,68 @@
+"""add offers full-text search table
+
+Revision ID: e8b4d2a61c90
+Revises: d5a19c3e7f42
+Create Date: 2026-10-18 17:32:08.604215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e8b4d2a61c90"
+down_revision = "d5a19c3e7f42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Same DDL as ai.backend.search.SEARCH_DDL
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS offers_fts USING fts5(
+            have_name, want_name, location, message,
+            content='offers', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS offers_fts_ai AFTER INSERT ON offers BEGIN
+            INSERT INTO offers_fts (rowid, have_name, want_name, location, message)
+            VALUES (new.rowid, new.have_name, new.want_name, new.location, new.message);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS offers_fts_ad AFTER DELETE ON offers BEGIN
+            INSERT INTO offers_fts (offers_fts, rowid, have_name, want_name, location, message)
+            VALUES ('delete', old.rowid, old.have_name, old.want_name, old.location, old.message);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS offers_fts_au
+        AFTER UPDATE OF have_name, want_name, location, message ON offers BEGIN
+            INSERT INTO offers_fts (offers_fts, rowid, have_name, want_name, location, message)
+            VALUES ('delete', old.rowid, old.have_name, old.want_name, old.location, old.message);
+            INSERT INTO offers_fts (rowid, have_name, want_name, location, message)
+            VALUES (new.rowid, new.have_name, new.want_name, new.location, new.message);
+        END
+        """
+    )
+    # Index the offers that already exist
+    op.execute("INSERT INTO offers_fts (offers_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS offers_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS offers_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS offers_fts_ai")
+    op.execute("DROP TABLE IF EXISTS offers_fts")
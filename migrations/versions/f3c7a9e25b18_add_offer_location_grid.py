@@ -0,0 +1,170 @@
+"""add offer lat/lon and grid cell
+
+Revision ID: f3c7a9e25b18
+Revises: e8b4d2a61c90
+Create Date: 2026-10-18 18:41:27.330871
+
+"""
+import math
+import os
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f3c7a9e25b18"
+down_revision = "e8b4d2a61c90"
+branch_labels = None
+depends_on = None
+
+# --- Frozen copy of ai/backend/data/gazetteer.csv (name,lat,lon,aliases) ---
+_GAZETTEER = """
+lagos,6.524,3.379,lagos island;lagos state;eko
+ikeja,6.602,3.351,
+lekki,6.447,3.524,lekki phase 1
+victoria island,6.428,3.421,vi
+yaba,6.509,3.378,
+surulere,6.500,3.354,
+ajah,6.468,3.571,
+ikorodu,6.620,3.507,
+epe,6.584,3.984,
+badagry,6.416,2.881,
+ota,6.689,3.236,sango ota
+abeokuta,7.159,3.348,ogun
+sagamu,6.843,3.647,shagamu
+ijebu ode,6.821,3.917,ijebu
+ibadan,7.378,3.947,oyo state
+ogbomosho,8.134,4.240,ogbomoso
+oyo,7.851,3.931,
+ilorin,8.497,4.542,kwara
+osogbo,7.771,4.557,oshogbo;osun
+ile ife,7.467,4.566,ife
+akure,7.251,5.195,ondo
+ado ekiti,7.621,5.221,ekiti
+abuja,9.076,7.399,fct;federal capital territory
+minna,9.614,6.557,niger state
+bida,9.080,6.010,
+lokoja,7.802,6.743,kogi
+lafia,8.494,8.515,nasarawa
+makurdi,7.733,8.536,benue
+jos,9.897,8.858,plateau
+kaduna,10.523,7.438,
+zaria,11.086,7.719,
+kano,12.000,8.517,
+katsina,12.990,7.601,
+dutse,11.756,9.339,jigawa
+bauchi,10.314,9.844,
+gombe,10.290,11.167,
+yola,9.203,12.495,adamawa
+jalingo,8.893,11.359,taraba
+maiduguri,11.846,13.160,borno
+damaturu,11.747,11.961,yobe
+sokoto,13.063,5.243,
+birnin kebbi,12.454,4.197,kebbi
+gusau,12.170,6.664,zamfara
+benin city,6.335,5.627,benin;edo
+warri,5.517,5.750,
+asaba,6.198,6.731,delta
+port harcourt,4.815,7.049,ph;rivers
+yenagoa,4.925,6.264,bayelsa
+uyo,5.038,7.909,akwa ibom
+calabar,4.951,8.322,cross river
+aba,5.107,7.367,
+umuahia,5.526,7.489,abia
+owerri,5.485,7.035,imo
+onitsha,6.145,6.788,
+awka,6.210,7.072,anambra
+nnewi,6.019,6.917,
+enugu,6.459,7.549,
+nsukka,6.857,7.396,
+abakaliki,6.325,8.113,ebonyi
+accra,5.604,-0.187,
+kumasi,6.688,-1.624,
+tamale,9.401,-0.853,
+lome,6.131,1.223,
+cotonou,6.366,2.418,
+porto novo,6.497,2.605,
+niamey,13.512,2.113,
+douala,4.051,9.768,
+yaounde,3.848,11.502,
+nairobi,-1.286,36.817,
+"""
+
+# Same setting the app files offers under (ai.backend.settings.GEO_CELL_DEG)
+_CELL_DEG = float(os.getenv("AFROMARKET_GEO_CELL_DEG", "0.5"))
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize_place(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _load_places():
+    places = {}
+    for line in _GAZETTEER.strip().splitlines():
+        name, lat, lon, aliases = line.split(",")
+        point = (float(lat), float(lon))
+        places[_normalize_place(name)] = point
+        for alias in filter(None, aliases.split(";")):
+            places.setdefault(_normalize_place(alias), point)
+    return places
+
+
+def _resolve_location(text, places=_load_places()):
+    """Whole string first, then the first known place name in it, longest first."""
+    norm = _normalize_place(text)
+    if norm in places:
+        return places[norm]
+    words = norm.split()
+    max_words = max(len(name.split()) for name in places)
+    for start in range(len(words)):
+        for size in range(min(max_words, len(words) - start), 0, -1):
+            point = places.get(" ".join(words[start:start + size]))
+            if point is not None:
+                return point
+    return None
+
+
+def _cell_key(lat, lon):
+    return f"{math.floor(lat / _CELL_DEG)}:{math.floor(lon / _CELL_DEG)}"
+
+
+def upgrade() -> None:
+    op.add_column("offers", sa.Column("lat", sa.Float(), nullable=True))
+    op.add_column("offers", sa.Column("lon", sa.Float(), nullable=True))
+    op.add_column("offers", sa.Column("geo_cell", sa.String(), nullable=True))
+    op.create_index(
+        "ix_offers_geo_cell_status", "offers", ["geo_cell", "status"], if_not_exists=True
+    )
+
+    # Resolve existing free-text locations against the gazetteer as it was
+    # when this revision was written (frozen below, not ai.backend.geo)
+    bind = op.get_bind()
+    locations = bind.execute(
+        sa.text("SELECT DISTINCT location FROM offers WHERE location IS NOT NULL")
+    ).scalars().all()
+    for location in locations:
+        point = _resolve_location(location)
+        if point is None:
+            continue
+        bind.execute(
+            sa.text(
+                "UPDATE offers SET lat = :lat, lon = :lon, geo_cell = :cell"
+                " WHERE location = :location"
+            ),
+            {"lat": point[0], "lon": point[1], "cell": _cell_key(*point), "location": location},
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offers_geo_cell_status", table_name="offers", if_exists=True)
+    with op.batch_alter_table("offers") as batch_op:
+        batch_op.drop_column("geo_cell")
+        batch_op.drop_column("lon")
+        batch_op.drop_column("lat")
@@ -0,0 +1,35 @@
+"""revoked_tokens table: logouts shared by every worker
+
+Revision ID: f9d4b1e7a3c2
+Revises: e2b6c8f41a59
+Create Date: 2026-10-19 10:14:52.603917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f9d4b1e7a3c2"
+down_revision = "e2b6c8f41a59"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("token_key", sa.String(), nullable=False, unique=True),
+        sa.Column("exp", sa.Float(), nullable=False),
+        sqlite_autoincrement=True,
+        if_not_exists=True,
+    )
+    op.create_index("ix_revoked_tokens_exp", "revoked_tokens", ["exp"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_tokens_exp", table_name="revoked_tokens", if_exists=True)
+    op.drop_table("revoked_tokens")